@@ -3,16 +3,28 @@ Admin API endpoints.
 User management and audit log access.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 from typing import List, Optional
+from cachetools import TTLCache
 
 from app.security.jwt import get_current_user, require_role
 from app.security.audit import log_action
+from app.api.etag import make_etag, is_fresh, not_modified
+from app.deps import get_admin_service
 from app.services.admin_service import AdminService
 
 router = APIRouter()
 
+ROLES = ("admin", "manager", "user")
+VALID_ROLES = frozenset(ROLES)
+_INVALID_ROLE_MSG = f"Invalid role. Must be one of: {', '.join(ROLES)}"
+
+# Dashboard stats, tagged with the data version they were computed at.
+# Entries also expire after 60s since the today/this-week counts move with
+# the clock.
+_dashboard_cache = TTLCache(maxsize=4, ttl=60)
+
 
 class UserResponse(BaseModel):
     id: str
@@ -46,9 +58,11 @@ class AuditLogEntry(BaseModel):
 
 class AuditLogResponse(BaseModel):
     logs: List[AuditLogEntry]
-    total: int
+    total: Optional[int] = None  # Only set when include_total=true
     page: int
     page_size: int
+    has_next: bool
+    next_cursor: Optional[str] = None
 
 
 class DashboardStats(BaseModel):
@@ -63,36 +77,43 @@ class DashboardStats(BaseModel):
 @router.get("/users", response_model=UserListResponse)
 async def list_users(
     role: Optional[str] = None,
-    current_user: dict = Depends(require_role(["admin"]))
+    admin_service: AdminService = Depends(get_admin_service),
+    current_user: dict = Depends(require_role(("admin",)))
 ):
     """
     List all users (admin only).
     """
-    admin_service = AdminService()
-
-    users = await admin_service.list_users(role=role)
+    users = admin_service.list_users(role=role)
 
+    # Rows come straight from the store, so skip per-row validation
     return UserListResponse(
-        users=[UserResponse(**u) for u in users],
+        users=[UserResponse.model_construct(**u) for u in users],
         total=len(users)
     )
 
 
 @router.get("/users/{user_id}", response_model=UserResponse)
 async def get_user(
+    request: Request,
+    response: Response,
     user_id: str,
-    current_user: dict = Depends(require_role(["admin"]))
+    admin_service: AdminService = Depends(get_admin_service),
+    current_user: dict = Depends(require_role(("admin",)))
 ):
     """
     Get a specific user by ID (admin only).
+    Returns 304 when If-None-Match matches the current version.
     """
-    admin_service = AdminService()
-
-    user = await admin_service.get_user(user_id)
+    user = admin_service.get_user(user_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    etag = make_etag(*user.values())
+    if is_fresh(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
     return UserResponse(**user)
 
 
@@ -100,7 +121,8 @@ async def get_user(
 async def update_user_role(
     user_id: str,
     request: UpdateRoleRequest,
-    current_user: dict = Depends(require_role(["admin"]))
+    admin_service: AdminService = Depends(get_admin_service),
+    current_user: dict = Depends(require_role(("admin",)))
 ):
     """
     Update a user's role (admin only).
@@ -110,11 +132,8 @@ async def update_user_role(
     - manager: Can create workflows, view all documents
     - user: Can only manage own documents
     """
-    if request.role not in ["admin", "manager", "user"]:
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid role. Must be one of: admin, manager, user"
-        )
+    if request.role not in VALID_ROLES:
+        raise HTTPException(status_code=400, detail=_INVALID_ROLE_MSG)
 
     # Prevent self-demotion
     if user_id == current_user["id"] and request.role != "admin":
@@ -123,16 +142,14 @@ async def update_user_role(
             detail="Cannot change your own admin role"
         )
 
-    admin_service = AdminService()
-
-    user = await admin_service.get_user(user_id)
+    user = admin_service.get_user(user_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    updated = await admin_service.update_role(user_id, request.role)
+    updated = admin_service.update_role(user_id, request.role)
 
-    await log_action(
+    log_action(  # fire-and-forget
         user_id=current_user["id"],
         action="USER_ROLE_UPDATED",
         resource_type="user",
@@ -152,10 +169,15 @@ async def get_audit_logs(
     date_to: Optional[str] = None,
     page: int = 1,
     page_size: int = 50,
-    current_user: dict = Depends(require_role(["admin"]))
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    admin_service: AdminService = Depends(get_admin_service),
+    current_user: dict = Depends(require_role(("admin",)))
 ):
     """
     View audit logs with filtering (admin only).
+    Pass the previous response's next_cursor to fetch the following page.
+    Pass include_total=true to also count all matching entries.
 
     Logs all security-relevant actions:
     - User registration, login, logout
@@ -163,36 +185,50 @@ async def get_audit_logs(
     - Workflow creation, modification, deletion
     - Role changes
     """
-    admin_service = AdminService()
-
-    logs, total = await admin_service.get_audit_logs(
-        user_id=user_id,
-        action=action,
-        resource_type=resource_type,
-        date_from=date_from,
-        date_to=date_to,
-        page=page,
-        page_size=page_size
-    )
+    try:
+        logs, total, next_cursor = admin_service.get_audit_logs(
+            user_id=user_id,
+            action=action,
+            resource_type=resource_type,
+            date_from=date_from,
+            date_to=date_to,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    # Rows come straight from the store, so skip per-row validation
     return AuditLogResponse(
-        logs=[AuditLogEntry(**log) for log in logs],
+        logs=[AuditLogEntry.model_construct(**log) for log in logs],
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        has_next=next_cursor is not None,
+        next_cursor=next_cursor
     )
 
 
 @router.get("/dashboard", response_model=DashboardStats)
 async def get_dashboard_stats(
-    current_user: dict = Depends(require_role(["admin", "manager"]))
+    admin_service: AdminService = Depends(get_admin_service),
+    current_user: dict = Depends(require_role(("admin", "manager")))
 ):
     """
     Get dashboard statistics (admin and manager).
+    Cached until users or documents change, for up to 60 seconds.
     """
-    admin_service = AdminService()
+    cache_key = ("dashboard", current_user["role"])
+    version = admin_service.get_stats_version()
+    cached = _dashboard_cache.get(cache_key)
 
-    stats = await admin_service.get_dashboard_stats()
+    if cached and cached[0] == version:
+        stats = cached[1]
+    else:
+        stats = admin_service.get_dashboard_stats()
+        _dashboard_cache[cache_key] = (version, stats)
 
     return DashboardStats(**stats)
 
@@ -200,7 +236,8 @@ async def get_dashboard_stats(
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: str,
-    current_user: dict = Depends(require_role(["admin"]))
+    admin_service: AdminService = Depends(get_admin_service),
+    current_user: dict = Depends(require_role(("admin",)))
 ):
     """
     Delete a user and all their documents (admin only).
@@ -211,16 +248,14 @@ async def delete_user(
             detail="Cannot delete your own account"
         )
 
-    admin_service = AdminService()
-
-    user = await admin_service.get_user(user_id)
+    user = admin_service.get_user(user_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    await admin_service.delete_user(user_id)
+    admin_service.delete_user(user_id)
 
-    await log_action(
+    log_action(  # fire-and-forget
         user_id=current_user["id"],
         action="USER_DELETED",
         resource_type="user",
@@ -9,6 +9,7 @@ from typing import Optional
 
 from app.security.jwt import create_access_token, get_current_user
 from app.security.audit import log_action
+from app.deps import get_auth_service
 from app.services.auth_service import AuthService
 
 router = APIRouter()
@@ -40,7 +41,10 @@ class UserResponse(BaseModel):
 
 
 @router.post("/register", response_model=TokenResponse)
-async def register(request: RegisterRequest):
+async def register(
+    request: RegisterRequest,
+    auth_service: AuthService = Depends(get_auth_service)
+):
     """
     Register a new user account.
 
@@ -48,8 +52,6 @@ async def register(request: RegisterRequest):
     - Creates user profile with default 'user' role
     - Returns JWT token for immediate login
     """
-    auth_service = AuthService()
-
     try:
         user = await auth_service.register(
             email=request.email,
@@ -59,7 +61,7 @@ async def register(request: RegisterRequest):
 
         token = create_access_token({"sub": user["id"], "role": user["role"]})
 
-        await log_action(
+        log_action(  # fire-and-forget
             user_id=user["id"],
             action="USER_REGISTERED",
             resource_type="user",
@@ -79,12 +81,13 @@ async def register(request: RegisterRequest):
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(request: LoginRequest):
+async def login(
+    request: LoginRequest,
+    auth_service: AuthService = Depends(get_auth_service)
+):
     """
     Authenticate user and return JWT token.
     """
-    auth_service = AuthService()
-
     try:
         user = await auth_service.login(
             email=request.email,
@@ -93,7 +96,7 @@ async def login(request: LoginRequest):
 
         token = create_access_token({"sub": user["id"], "role": user["role"]})
 
-        await log_action(
+        log_action(  # fire-and-forget
             user_id=user["id"],
             action="USER_LOGIN",
             resource_type="user",
@@ -126,7 +129,7 @@ async def logout(current_user: dict = Depends(get_current_user)):
     Log out the current user.
     Note: JWT is stateless, so this mainly logs the action.
     """
-    await log_action(
+    log_action(  # fire-and-forget
         user_id=current_user["id"],
         action="USER_LOGOUT",
         resource_type="user",
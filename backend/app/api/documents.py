@@ -3,21 +3,41 @@ Document Management API endpoints.
 Handles upload, retrieval, and processing of documents.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status, Request
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, AsyncIterator
 from datetime import datetime
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
 import uuid
 
-from app.security.jwt import get_current_user
+from app.config import settings
+from app.security.jwt import get_current_user, get_optional_user
 from app.security.audit import log_action
+from app.api.etag import make_etag, is_fresh, not_modified
+from app.deps import get_document_service, get_storage_service
 from app.services.document_service import DocumentService
-from app.services.storage_service import StorageService
+from app.services.storage_service import StorageService, verify_signature
 from app.services.demo_store import add_document, get_all_documents, get_stats
 from app.ml.pipeline import process_document
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+# References to in-flight processing tasks (the event loop only keeps weak ones)
+_processing_tasks: set = set()
+
+# Uploads are read in chunks of this size
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+ALLOWED_EXTENSIONS = frozenset(settings.allowed_extensions)
+_ALLOWED_EXTENSIONS_MSG = ", ".join(settings.allowed_extensions)
+
 
 class DocumentResponse(BaseModel):
     id: str
@@ -34,19 +54,91 @@ class DocumentResponse(BaseModel):
 
 class DocumentListResponse(BaseModel):
     documents: List[DocumentResponse]
-    total: int
+    total: Optional[int] = None  # Only set when include_total=true
     page: int
     page_size: int
+    has_next: bool
+    next_cursor: Optional[str] = None
 
 
 class UpdateDocumentRequest(BaseModel):
     tags: Optional[List[str]] = None
 
 
+def _file_too_large() -> HTTPException:
+    max_mb = settings.max_file_size // (1024 * 1024)
+    return HTTPException(status_code=400, detail=f"File too large. Maximum size is {max_mb}MB")
+
+
+async def _iter_upload(file: UploadFile, digest=None) -> AsyncIterator[bytes]:
+    """
+    Yield an uploaded file in chunks.
+    Fails as soon as the running size passes the upload limit.
+    If a hashlib digest is given, it is updated with every chunk.
+    """
+    if file.size is not None and file.size > settings.max_file_size:
+        raise _file_too_large()
+
+    received = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        received += len(chunk)
+        if received > settings.max_file_size:
+            raise _file_too_large()
+        if digest is not None:
+            digest.update(chunk)
+        yield chunk
+
+
+async def _process_upload(
+    document_id: str,
+    user_id: str,
+    file_path: str,
+    mime_type: str,
+    classifier,
+    entity_extractor,
+    classify_batcher=None,
+    ocr=None
+):
+    """
+    Background job: run the ML pipeline on a stored upload and save the results.
+    """
+    document_service = get_document_service()
+
+    try:
+        content = await get_storage_service().download(file_path)
+
+        processed = await process_document(
+            document_id=document_id,
+            file_path=file_path,
+            content=content,
+            mime_type=mime_type,
+            classifier=classifier,
+            entity_extractor=entity_extractor,
+            classify_batcher=classify_batcher,
+            ocr=ocr
+        )
+
+        # Scoped to the uploader: a no-op if the document was deleted meanwhile
+        document_service.update_if_owner(
+            document_id,
+            user_id,
+            classification=processed["classification"],
+            confidence_score=processed["confidence"],
+            extracted_text=processed["text"],
+            entities=processed["entities"],
+            status="processed"
+        )
+    except Exception as e:
+        logger.error(f"Processing failed for document {document_id}: {e}")
+        document_service.update_if_owner(document_id, user_id, status="failed")
+
+
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
     request: Request,
     file: UploadFile = File(...),
+    document_service: DocumentService = Depends(get_document_service),
+    storage_service: StorageService = Depends(get_storage_service),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -60,82 +152,96 @@ async def upload_document(
     5. Extract named entities (dates, names, amounts)
     6. Store metadata in database
     7. Evaluate workflow rules
-    """
-    document_service = DocumentService()
-    storage_service = StorageService()
 
+    A file whose content matches one of the user's existing documents
+    returns that document instead of being stored and processed again.
+    If processing that document failed, it is replaced by the new upload.
+
+    Steps 3-5 run in the background: the document is returned with
+    status "processing" and moves to "processed" (or "failed") when done.
+    """
     # Validate file
     if not file.filename:
         raise HTTPException(status_code=400, detail="No filename provided")
 
     # Check file extension
-    allowed_extensions = [".pdf", ".png", ".jpg", ".jpeg", ".doc", ".docx", ".txt"]
-    file_ext = "." + file.filename.split(".")[-1].lower()
-    if file_ext not in allowed_extensions:
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
-            detail=f"File type not allowed. Supported: {', '.join(allowed_extensions)}"
+            detail=f"File type not allowed. Supported: {_ALLOWED_EXTENSIONS_MSG}"
         )
 
     try:
-        # Read file content
-        content = await file.read()
-        file_size = len(content)
-
-        # Check file size (10MB limit)
-        if file_size > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="File too large. Maximum size is 10MB")
-
         # Generate unique file path
         file_id = str(uuid.uuid4())
         file_path = f"{current_user['id']}/{file_id}{file_ext}"
 
-        # Upload to storage
-        await storage_service.upload(file_path, content, file.content_type)
+        # Stream to storage (enforces the size limit and hashes as chunks arrive)
+        digest = hashlib.sha256()
+        file_size = await storage_service.upload_stream(
+            file_path, _iter_upload(file, digest), file.content_type
+        )
+        content_hash = digest.hexdigest()
+
+        # Same content already uploaded by this user: reuse it and skip
+        # processing, unless processing it failed last time
+        existing = document_service.get_by_hash(current_user["id"], content_hash)
+        if existing and existing["status"] != "failed":
+            await storage_service.delete(file_path)
+
+            log_action(  # fire-and-forget
+                user_id=current_user["id"],
+                action="DOCUMENT_UPLOADED",
+                resource_type="document",
+                resource_id=existing["id"],
+                details={"filename": file.filename, "duplicate": True}
+            )
+
+            return DocumentResponse(**existing)
+
+        if existing:
+            # Replace the failed record with this upload, processed afresh
+            document_service.delete(existing["id"])
+            await storage_service.delete(existing["file_path"])
 
         # Create document record
-        document = await document_service.create(
+        document = document_service.create(
             user_id=current_user["id"],
             filename=file.filename,
             file_path=file_path,
             file_size=file_size,
-            mime_type=file.content_type
+            mime_type=file.content_type,
+            content_hash=content_hash
         )
 
-        # Process document asynchronously (classification, OCR, NER)
-        classifier = request.app.state.classifier
-        entity_extractor = request.app.state.entity_extractor
-
-        processed = await process_document(
+        # Run OCR/classification/NER off the request path
+        task = asyncio.create_task(_process_upload(
             document_id=document["id"],
+            user_id=current_user["id"],
             file_path=file_path,
-            content=content,
             mime_type=file.content_type,
-            classifier=classifier,
-            entity_extractor=entity_extractor
-        )
-
-        # Update document with processing results
-        document = await document_service.update(
-            document_id=document["id"],
-            classification=processed["classification"],
-            confidence_score=processed["confidence"],
-            extracted_text=processed["text"],
-            entities=processed["entities"],
-            status="processed"
-        )
+            classifier=request.app.state.classifier,
+            entity_extractor=request.app.state.entity_extractor,
+            classify_batcher=request.app.state.classify_batcher,
+            ocr=request.app.state.ocr
+        ))
+        _processing_tasks.add(task)
+        task.add_done_callback(_processing_tasks.discard)
 
         # Log action
-        await log_action(
+        log_action(  # fire-and-forget
             user_id=current_user["id"],
             action="DOCUMENT_UPLOADED",
             resource_type="document",
             resource_id=document["id"],
-            details={"filename": file.filename, "classification": processed["classification"]}
+            details={"filename": file.filename}
         )
 
         return DocumentResponse(**document)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -167,23 +273,18 @@ async def demo_upload_document(
         raise HTTPException(status_code=400, detail="No filename provided")
 
     # Check file extension
-    allowed_extensions = [".pdf", ".png", ".jpg", ".jpeg", ".doc", ".docx", ".txt"]
-    file_ext = "." + file.filename.split(".")[-1].lower()
-    if file_ext not in allowed_extensions:
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
-            detail=f"File type not allowed. Supported: {', '.join(allowed_extensions)}"
+            detail=f"File type not allowed. Supported: {_ALLOWED_EXTENSIONS_MSG}"
         )
 
     try:
-        # Read file content
-        content = await file.read()
+        # Read file content (enforces the size limit as chunks arrive)
+        content = b"".join([chunk async for chunk in _iter_upload(file)])
         file_size = len(content)
 
-        # Check file size (10MB limit)
-        if file_size > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="File too large. Maximum size is 10MB")
-
         # Generate a temporary ID for demo
         file_id = str(uuid.uuid4())
 
@@ -191,14 +292,19 @@ async def demo_upload_document(
         classifier = request.app.state.classifier
         entity_extractor = request.app.state.entity_extractor
 
-        processed = await process_document(
-            document_id=file_id,
-            file_path=f"demo/{file_id}{file_ext}",
-            content=content,
-            mime_type=file.content_type or "application/octet-stream",
-            classifier=classifier,
-            entity_extractor=entity_extractor
-        )
+        # No background queue here (nothing is persisted), so cap how many
+        # demo uploads run the models at once
+        async with request.app.state.demo_processing_slots:
+            processed = await process_document(
+                document_id=file_id,
+                file_path=f"demo/{file_id}{file_ext}",
+                content=content,
+                mime_type=file.content_type or "application/octet-stream",
+                classifier=classifier,
+                entity_extractor=entity_extractor,
+                classify_batcher=request.app.state.classify_batcher,
+                ocr=request.app.state.ocr
+            )
 
         # Store in demo store for persistence across pages
         doc_record = {
@@ -226,6 +332,8 @@ async def demo_upload_document(
             status="processed"
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -281,48 +389,79 @@ async def demo_get_stats():
 
 @router.get("", response_model=DocumentListResponse)
 async def list_documents(
+    request: Request,
+    response: Response,
     page: int = 1,
     page_size: int = 20,
     classification: Optional[str] = None,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    document_service: DocumentService = Depends(get_document_service),
     current_user: dict = Depends(get_current_user)
 ):
     """
     List documents for the current user with optional filtering.
+
+    For large collections, pass the previous response's next_cursor as
+    `cursor` instead of increasing `page`. Pass include_total=true to also
+    count all matching documents.
+
+    Returns 304 when If-None-Match matches and nothing has changed.
     """
-    document_service = DocumentService()
+    # The user's collection version plus the query identifies the page
+    version = document_service.get_version(current_user["id"])
+    etag = make_etag(current_user["id"], version, str(request.query_params))
+    if is_fresh(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
 
-    documents, total = await document_service.list(
-        user_id=current_user["id"],
-        page=page,
-        page_size=page_size,
-        classification=classification,
-        status=status
-    )
+    try:
+        documents, total, next_cursor = document_service.list(
+            user_id=current_user["id"],
+            page=page,
+            page_size=page_size,
+            classification=classification,
+            status=status,
+            cursor=cursor,
+            include_total=include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    # Rows come straight from the store, so skip per-row validation
     return DocumentListResponse(
-        documents=[DocumentResponse(**doc) for doc in documents],
+        documents=[DocumentResponse.model_construct(**doc) for doc in documents],
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        has_next=next_cursor is not None,
+        next_cursor=next_cursor
     )
 
 
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(
+    request: Request,
+    response: Response,
     document_id: str,
+    document_service: DocumentService = Depends(get_document_service),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Get a specific document by ID.
+    Returns 304 when If-None-Match matches the current version.
     """
-    document_service = DocumentService()
-
-    document = await document_service.get(document_id, current_user["id"])
+    document = document_service.get(document_id, current_user["id"])
 
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
 
+    etag = make_etag(document["id"], document["updated_at"])
+    if is_fresh(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
     return DocumentResponse(**document)
 
 
@@ -330,24 +469,22 @@ async def get_document(
 async def update_document(
     document_id: str,
     request: UpdateDocumentRequest,
+    document_service: DocumentService = Depends(get_document_service),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Update document metadata (tags, etc).
     """
-    document_service = DocumentService()
-
-    document = await document_service.get(document_id, current_user["id"])
-
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
-
-    updated = await document_service.update(
+    updated = document_service.update_if_owner(
         document_id=document_id,
+        user_id=current_user["id"],
         tags=request.tags
     )
 
-    await log_action(
+    if not updated:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    log_action(  # fire-and-forget
         user_id=current_user["id"],
         action="DOCUMENT_UPDATED",
         resource_type="document",
@@ -360,15 +497,15 @@ async def update_document(
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: str,
+    document_service: DocumentService = Depends(get_document_service),
+    storage_service: StorageService = Depends(get_storage_service),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Delete a document and its associated file.
     """
-    document_service = DocumentService()
-    storage_service = StorageService()
-
-    document = await document_service.get(document_id, current_user["id"])
+    # Delete database record (ownership is checked in the same call)
+    document = document_service.delete_if_owner(document_id, current_user["id"])
 
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
@@ -376,10 +513,7 @@ async def delete_document(
     # Delete file from storage
     await storage_service.delete(document["file_path"])
 
-    # Delete database record
-    await document_service.delete(document_id)
-
-    await log_action(
+    log_action(  # fire-and-forget
         user_id=current_user["id"],
         action="DOCUMENT_DELETED",
         resource_type="document",
@@ -393,15 +527,14 @@ async def delete_document(
 @router.get("/{document_id}/download")
 async def download_document(
     document_id: str,
+    document_service: DocumentService = Depends(get_document_service),
+    storage_service: StorageService = Depends(get_storage_service),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Get a signed URL to download the original document.
     """
-    document_service = DocumentService()
-    storage_service = StorageService()
-
-    document = await document_service.get(document_id, current_user["id"])
+    document = document_service.get(document_id, current_user["id"])
 
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
@@ -409,7 +542,7 @@ async def download_document(
     # Generate signed URL (valid for 1 hour)
     download_url = await storage_service.get_signed_url(document["file_path"])
 
-    await log_action(
+    log_action(  # fire-and-forget
         user_id=current_user["id"],
         action="DOCUMENT_DOWNLOADED",
         resource_type="document",
@@ -417,3 +550,50 @@ async def download_document(
     )
 
     return {"download_url": download_url, "filename": document["filename"]}
+
+
+@router.get("/download/{file_path:path}")
+async def download_file(
+    file_path: str,
+    expires: Optional[int] = None,
+    signature: Optional[str] = None,
+    storage_service: StorageService = Depends(get_storage_service),
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
+    """
+    Stream a stored file (the local-storage target of get_signed_url).
+
+    Authorized by the URL's signature while it hasn't expired, or else by
+    a bearer token for files under the user's own storage prefix.
+    """
+    parts = file_path.split("/")
+    if ".." in parts:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if signature is not None:
+        if expires is None or not verify_signature(file_path, expires, signature):
+            raise HTTPException(status_code=403, detail="Invalid or expired download link")
+    elif current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    elif parts[0] != current_user["id"]:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    try:
+        file_size = await storage_service.get_file_size(file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    media_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+
+    # identity keeps GZipMiddleware out: stored files are mostly already
+    # compressed (PDF, JPEG, PNG), and gzipping the stream would drop the
+    # Content-Length header
+    return StreamingResponse(
+        storage_service.stream(file_path),
+        media_type=media_type,
+        headers={"Content-Length": str(file_size), "Content-Encoding": "identity"}
+    )
@@ -0,0 +1,36 @@
+"""
+Conditional GET helpers.
+Weak ETags let clients revalidate unchanged resources and get a 304.
+"""
+
+from fastapi import Request, Response
+import hashlib
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a weak ETag from values that change whenever the resource does.
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def is_fresh(request: Request, etag: str) -> bool:
+    """
+    Check whether the client's If-None-Match already matches the ETag.
+    Uses weak comparison, as GET requests allow.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    if header.strip() == "*":
+        return True
+
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the current ETag."""
+    return Response(status_code=304, headers={"ETag": etag})
@@ -3,17 +3,18 @@ Search API endpoints.
 Full-text search across documents with filters.
 """
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from typing import List, Optional
+import re
 
 from app.security.jwt import get_current_user
+from app.deps import get_search_service
 from app.services.search_service import SearchService
 from app.services.demo_store import search_documents as demo_search
 
 router = APIRouter()
 
-
 class SearchResult(BaseModel):
     id: str
     filename: str
@@ -46,6 +47,7 @@ async def search_documents(
     date_to: Optional[str] = None,
     page: int = 1,
     page_size: int = 20,
+    search_service: SearchService = Depends(get_search_service),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -57,19 +59,20 @@ async def search_documents(
     - Returns highlighted snippets showing match context
     - Results ranked by relevance score
     """
-    search_service = SearchService()
-
-    results, total = await search_service.search(
-        user_id=current_user["id"],
-        query=q,
-        classification=classification,
-        entity_type=entity_type,
-        entity_value=entity_value,
-        date_from=date_from,
-        date_to=date_to,
-        page=page,
-        page_size=page_size
-    )
+    try:
+        results, total = search_service.search(
+            user_id=current_user["id"],
+            query=q,
+            classification=classification,
+            entity_type=entity_type,
+            entity_value=entity_value,
+            date_from=date_from,
+            date_to=date_to,
+            page=page,
+            page_size=page_size
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     filters_applied = {
         "classification": classification,
@@ -88,7 +91,10 @@ async def search_documents(
 
 
 @router.get("/filters", response_model=FilterOptions)
-async def get_filter_options(current_user: dict = Depends(get_current_user)):
+async def get_filter_options(
+    search_service: SearchService = Depends(get_search_service),
+    current_user: dict = Depends(get_current_user)
+):
     """
     Get available filter options for the current user's documents.
 
@@ -96,10 +102,10 @@ async def get_filter_options(current_user: dict = Depends(get_current_user)):
     - List of classifications present in user's documents
     - List of entity types extracted
     - Date range of documents
-    """
-    search_service = SearchService()
 
-    options = await search_service.get_filter_options(current_user["id"])
+    Cached per user until their documents change.
+    """
+    options = search_service.get_filter_options(current_user["id"])
 
     return FilterOptions(**options)
 
@@ -107,15 +113,14 @@ async def get_filter_options(current_user: dict = Depends(get_current_user)):
 @router.get("/suggest")
 async def suggest_queries(
     q: str = Query(..., min_length=2),
+    search_service: SearchService = Depends(get_search_service),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Get search query suggestions based on partial input.
     Suggests based on document titles, entity values, and tags.
     """
-    search_service = SearchService()
-
-    suggestions = await search_service.suggest(
+    suggestions = search_service.suggest(
         user_id=current_user["id"],
         partial_query=q
     )
@@ -151,6 +156,9 @@ async def demo_search_documents(
     """
     results = demo_search(q)
 
+    # Case-insensitive matcher for highlighting, compiled once per request
+    highlight = re.compile(re.escape(q), re.IGNORECASE) if q else None
+
     # Format results with snippets
     formatted_results = []
     for doc in results:
@@ -158,12 +166,9 @@ async def demo_search_documents(
         text = doc.get("extracted_text", "")
         snippet = text[:200] + "..." if len(text) > 200 else text
 
-        # Highlight query in snippet if present
-        if q and q.lower() in snippet.lower():
-            # Simple highlight by finding position
-            idx = snippet.lower().find(q.lower())
-            if idx >= 0:
-                snippet = f"{snippet[:idx]}**{snippet[idx:idx+len(q)]}**{snippet[idx+len(q):]}"
+        # Highlight first match of the query in the snippet
+        if highlight:
+            snippet = highlight.sub(r"**\g<0>**", snippet, count=1)
 
         formatted_results.append(DemoSearchResult(
             id=doc["id"],
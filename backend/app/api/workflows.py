@@ -3,12 +3,14 @@ Workflow Automation API endpoints.
 Create and manage document processing rules.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Any
 
 from app.security.jwt import get_current_user, require_role
 from app.security.audit import log_action
+from app.deps import get_workflow_service
 from app.services.workflow_service import WorkflowService
 
 router = APIRouter()
@@ -52,10 +54,27 @@ class WorkflowListResponse(BaseModel):
     total: int
 
 
+def _json(model: BaseModel) -> Response:
+    """
+    Serialize a response model straight to JSON bytes with pydantic-core,
+    bypassing FastAPI's encoder (response_model is kept for the docs only).
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+def _workflow_model(workflow: dict) -> WorkflowResponse:
+    """
+    Wrap a stored workflow for output.
+    Workflows come from our own service layer, so validation is skipped.
+    """
+    return WorkflowResponse.model_construct(**workflow)
+
+
 @router.post("", response_model=WorkflowResponse)
 async def create_workflow(
     request: CreateWorkflowRequest,
-    current_user: dict = Depends(require_role(["admin", "manager"]))
+    workflow_service: WorkflowService = Depends(get_workflow_service),
+    current_user: dict = Depends(require_role(("admin", "manager")))
 ):
     """
     Create a new workflow automation rule.
@@ -70,8 +89,6 @@ async def create_workflow(
     - tag: {"tag": "high-value"}
     - notify: {"email": "finance@company.com", "message": "High-value invoice received"}
     """
-    workflow_service = WorkflowService()
-
     workflow = await workflow_service.create(
         name=request.name,
         description=request.description,
@@ -81,7 +98,7 @@ async def create_workflow(
         created_by=current_user["id"]
     )
 
-    await log_action(
+    log_action(  # fire-and-forget
         user_id=current_user["id"],
         action="WORKFLOW_CREATED",
         resource_type="workflow",
@@ -89,56 +106,53 @@ async def create_workflow(
         details={"name": request.name}
     )
 
-    return WorkflowResponse(**workflow)
+    return _json(_workflow_model(workflow))
 
 
 @router.get("", response_model=WorkflowListResponse)
 async def list_workflows(
     is_active: Optional[bool] = None,
+    workflow_service: WorkflowService = Depends(get_workflow_service),
     current_user: dict = Depends(get_current_user)
 ):
     """
     List all workflow rules.
     """
-    workflow_service = WorkflowService()
-
     workflows = await workflow_service.list(is_active=is_active)
 
-    return WorkflowListResponse(
-        workflows=[WorkflowResponse(**w) for w in workflows],
+    return _json(WorkflowListResponse.model_construct(
+        workflows=[_workflow_model(w) for w in workflows],
         total=len(workflows)
-    )
+    ))
 
 
 @router.get("/{workflow_id}", response_model=WorkflowResponse)
 async def get_workflow(
     workflow_id: str,
+    workflow_service: WorkflowService = Depends(get_workflow_service),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Get a specific workflow by ID.
     """
-    workflow_service = WorkflowService()
-
     workflow = await workflow_service.get(workflow_id)
 
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
 
-    return WorkflowResponse(**workflow)
+    return _json(_workflow_model(workflow))
 
 
 @router.put("/{workflow_id}", response_model=WorkflowResponse)
 async def update_workflow(
     workflow_id: str,
     request: CreateWorkflowRequest,
-    current_user: dict = Depends(require_role(["admin", "manager"]))
+    workflow_service: WorkflowService = Depends(get_workflow_service),
+    current_user: dict = Depends(require_role(("admin", "manager")))
 ):
     """
     Update an existing workflow rule.
     """
-    workflow_service = WorkflowService()
-
     workflow = await workflow_service.get(workflow_id)
 
     if not workflow:
@@ -153,26 +167,25 @@ async def update_workflow(
         is_active=request.is_active
     )
 
-    await log_action(
+    log_action(  # fire-and-forget
         user_id=current_user["id"],
         action="WORKFLOW_UPDATED",
         resource_type="workflow",
         resource_id=workflow_id
     )
 
-    return WorkflowResponse(**updated)
+    return _json(_workflow_model(updated))
 
 
 @router.delete("/{workflow_id}")
 async def delete_workflow(
     workflow_id: str,
-    current_user: dict = Depends(require_role(["admin"]))
+    workflow_service: WorkflowService = Depends(get_workflow_service),
+    current_user: dict = Depends(require_role(("admin",)))
 ):
     """
     Delete a workflow rule.
     """
-    workflow_service = WorkflowService()
-
     workflow = await workflow_service.get(workflow_id)
 
     if not workflow:
@@ -180,7 +193,7 @@ async def delete_workflow(
 
     await workflow_service.delete(workflow_id)
 
-    await log_action(
+    log_action(  # fire-and-forget
         user_id=current_user["id"],
         action="WORKFLOW_DELETED",
         resource_type="workflow",
@@ -188,19 +201,18 @@ async def delete_workflow(
         details={"name": workflow["name"]}
     )
 
-    return {"message": "Workflow deleted successfully"}
+    return ORJSONResponse({"message": "Workflow deleted successfully"})
 
 
 @router.post("/{workflow_id}/toggle")
 async def toggle_workflow(
     workflow_id: str,
-    current_user: dict = Depends(require_role(["admin", "manager"]))
+    workflow_service: WorkflowService = Depends(get_workflow_service),
+    current_user: dict = Depends(require_role(("admin", "manager")))
 ):
     """
     Toggle a workflow's active status.
     """
-    workflow_service = WorkflowService()
-
     workflow = await workflow_service.get(workflow_id)
 
     if not workflow:
@@ -211,7 +223,7 @@ async def toggle_workflow(
         is_active=not workflow["is_active"]
     )
 
-    await log_action(
+    log_action(  # fire-and-forget
         user_id=current_user["id"],
         action="WORKFLOW_TOGGLED",
         resource_type="workflow",
@@ -219,4 +231,4 @@ async def toggle_workflow(
         details={"is_active": updated["is_active"]}
     )
 
-    return {"is_active": updated["is_active"]}
+    return ORJSONResponse({"is_active": updated["is_active"]})
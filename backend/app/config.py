@@ -2,7 +2,8 @@
 Application configuration using Pydantic Settings.
 """
 
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import lru_cache
 from typing import List
 import os
 
@@ -10,6 +11,8 @@ import os
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
 
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False, frozen=True)
+
     # Application
     app_name: str = "DocVault AI"
     debug: bool = False
@@ -23,6 +26,7 @@ class Settings(BaseSettings):
     jwt_secret: str = "your-super-secret-key-change-in-production"
     jwt_algorithm: str = "HS256"
     jwt_expiration_minutes: int = 60 * 24  # 24 hours
+    jwt_refresh_expiration_days: int = 7
 
     # CORS
     cors_origins: List[str] = [
@@ -34,14 +38,30 @@ class Settings(BaseSettings):
     # File Upload
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     allowed_extensions: List[str] = [".pdf", ".png", ".jpg", ".jpeg", ".doc", ".docx", ".txt"]
+    storage_aio: bool = False  # STORAGE_AIO=1: local file I/O through caio (io_uring / Linux AIO)
+
+    # Audit log buffer: flush at this many queued entries or every N seconds
+    audit_batch_size: int = 500
+    audit_flush_interval: float = 5.0
+
+    # Keep at most this many audit entries in memory (oldest are dropped)
+    audit_retention: int = 100_000
+
+    # Also append audit entries to this file as JSON lines (empty disables)
+    audit_log_path: str = ""
 
     # ML Models
     classifier_model: str = "distilbert-base-uncased"
-    spacy_model: str = "en_core_web_sm"
+    classifier_backend: str = "pytorch"  # or "onnx" (int8, needs optimum[onnxruntime])
+    onnx_model_dir: str = "models"
+    spacy_model: str = "en_core_web_sm"  # en_core_web_trf is worth it with use_gpu
+    use_gpu: bool = False  # USE_GPU=1: CUDA + fp16 for the classifier, GPU for spaCy
+
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings once; .env is parsed and validated on first call only."""
+    return Settings()
 
 
-settings = Settings()
+settings = get_settings()
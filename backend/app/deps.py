@@ -0,0 +1,43 @@
+"""
+FastAPI dependencies for shared service instances.
+Each service is created once per process instead of on every request.
+"""
+
+from functools import lru_cache
+
+from app.services.admin_service import AdminService
+from app.services.auth_service import AuthService
+from app.services.document_service import DocumentService
+from app.services.search_service import SearchService
+from app.services.storage_service import StorageService
+from app.services.workflow_service import WorkflowService
+
+
+@lru_cache
+def get_admin_service() -> AdminService:
+    return AdminService()
+
+
+@lru_cache
+def get_auth_service() -> AuthService:
+    return AuthService()
+
+
+@lru_cache
+def get_document_service() -> DocumentService:
+    return DocumentService()
+
+
+@lru_cache
+def get_search_service() -> SearchService:
+    return SearchService()
+
+
+@lru_cache
+def get_storage_service() -> StorageService:
+    return StorageService()
+
+
+@lru_cache
+def get_workflow_service() -> WorkflowService:
+    return WorkflowService()
@@ -5,10 +5,21 @@ FastAPI application for document management with AI-powered processing.
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from contextlib import asynccontextmanager, suppress
+import asyncio
 
 from app.api import auth, documents, search, workflows, admin
 from app.config import settings
+from app.security import audit_buffer
+from app.security.audit import store_entries, archive_entries
+
+DEMO_PROCESSING_SLOTS = 4
+
+# Classification micro-batching: dispatch at 16 documents or after 20ms
+CLASSIFY_BATCH_SIZE = 16
+CLASSIFY_BATCH_WAIT = 0.02
 
 
 @asynccontextmanager
@@ -18,15 +29,41 @@ async def lifespan(app: FastAPI):
     print("[*] Starting DocVault AI...")
     from app.ml.classifier import DocumentClassifier
     from app.ml.ner import EntityExtractor
+    from app.ml.ocr import OCRProcessor
+    from app.ml.batching import MicroBatcher
 
-    app.state.classifier = DocumentClassifier()
-    app.state.entity_extractor = EntityExtractor()
+    app.state.classifier = DocumentClassifier(
+        backend=settings.classifier_backend,
+        onnx_model_dir=settings.onnx_model_dir,
+        use_gpu=settings.use_gpu
+    )
+    app.state.entity_extractor = EntityExtractor(settings.spacy_model, use_gpu=settings.use_gpu)
+    app.state.ocr = OCRProcessor()
     print("[+] ML models loaded")
 
+    # Batch classification across concurrent uploads
+    app.state.classify_batcher = MicroBatcher(
+        app.state.classifier.batch_classify,
+        max_batch_size=CLASSIFY_BATCH_SIZE,
+        max_wait=CLASSIFY_BATCH_WAIT
+    )
+
+    # Concurrent model runs allowed for the unauthenticated demo upload
+    app.state.demo_processing_slots = asyncio.Semaphore(DEMO_PROCESSING_SLOTS)
+
+    # Start batched audit log writer (also appending to the JSON lines file, if set)
+    audit_archive = archive_entries if settings.audit_log_path else None
+    audit_task = asyncio.create_task(audit_buffer.flush_loop(store_entries, audit_archive))
+
     yield
 
     # Shutdown
     print("[*] Shutting down DocVault AI...")
+    audit_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await audit_task
+    await audit_buffer.flush(store_entries, audit_archive)
+    app.state.ocr.close()
 
 
 app = FastAPI(
@@ -34,6 +71,7 @@ app = FastAPI(
     description="Intelligent Document Management System with AI-powered classification and extraction",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -45,6 +83,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON responses (document lists, search results, audit logs)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(documents.router, prefix="/api/documents", tags=["Documents"])
@@ -0,0 +1,87 @@
+"""
+Micro-batching for model inference.
+Collects concurrent single-item requests and runs them as one batch.
+"""
+
+from typing import Any, Callable, List, Optional, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Groups concurrent submit() calls into a single batch_fn call.
+
+    A batch is dispatched once max_batch_size items are waiting or
+    max_wait seconds after the first item arrived, whichever is first.
+    batch_fn runs in a worker thread so inference doesn't block the loop.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait: float = 0.02
+    ):
+        """
+        Args:
+            batch_fn: Takes a list of items, returns results in the same order
+            max_batch_size: Largest batch passed to batch_fn
+            max_wait: Seconds to wait for more items before dispatching
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: set = set()
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue one item and wait for its result from the next batch.
+        Raises whatever batch_fn raised for that batch.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._dispatch)
+
+        return await future
+
+    def _dispatch(self):
+        """Start a batch with everything currently waiting."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run batch_fn and resolve each caller's future."""
+        items = [item for item, _ in batch]
+
+        try:
+            results = await asyncio.to_thread(self.batch_fn, items)
+        except Exception as e:
+            logger.error(f"Batch of {len(items)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -4,8 +4,14 @@ Classifies documents into categories: invoice, contract, report, letter, form, o
 """
 
 from transformers import pipeline
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 import logging
+import os
+
+try:
+    import ahocorasick
+except ImportError:  # Optional: keyword fallback uses substring checks instead
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
@@ -28,27 +34,92 @@ class DocumentClassifier:
     Uses a pre-trained model that can classify text without task-specific training.
     """
 
-    def __init__(self, model_name: str = "facebook/bart-large-mnli"):
+    def __init__(
+        self,
+        model_name: str = "facebook/bart-large-mnli",
+        backend: str = "pytorch",
+        onnx_model_dir: Optional[str] = None,
+        use_gpu: bool = False
+    ):
         """
         Initialize the classifier with a zero-shot classification model.
 
         Args:
             model_name: Hugging Face model for zero-shot classification.
                         Default uses BART-large fine-tuned on MNLI.
+            backend: "pytorch", or "onnx" for an int8-quantized ONNX Runtime
+                     model (requires optimum[onnxruntime])
+            onnx_model_dir: Where the quantized model is exported and cached
+            use_gpu: Run the PyTorch model in FP16 on CUDA when available
         """
-        logger.info(f"Loading document classifier: {model_name}")
+        logger.info(f"Loading document classifier: {model_name} ({backend})")
         try:
-            self.classifier = pipeline(
-                "zero-shot-classification",
-                model=model_name,
-                device=-1  # CPU, set to 0 for GPU
-            )
+            self.classifier = None
+            if backend == "onnx":
+                self.classifier = self._load_onnx_pipeline(model_name, onnx_model_dir or "models")
+
+            if self.classifier is None:
+                self.classifier = pipeline(
+                    "zero-shot-classification",
+                    model=model_name,
+                    **self._device_kwargs(use_gpu)
+                )
             self.categories = DOCUMENT_CATEGORIES
             logger.info("Document classifier loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load classifier: {e}")
             self.classifier = None
 
+    def _device_kwargs(self, use_gpu: bool) -> dict:
+        """Pipeline device arguments: FP16 on the first GPU if requested and present."""
+        if use_gpu:
+            import torch
+
+            if torch.cuda.is_available():
+                logger.info("Running classifier on CUDA (fp16)")
+                return {"device": 0, "torch_dtype": torch.float16}
+
+            logger.warning("use_gpu is set but CUDA is not available; using CPU")
+
+        return {"device": -1}
+
+    def _load_onnx_pipeline(self, model_name: str, cache_dir: str):
+        """
+        Build a zero-shot pipeline over a dynamically quantized int8 ONNX model.
+
+        The model is exported and quantized on first startup, then loaded
+        from cache_dir. Returns None (PyTorch is used) if that fails.
+        """
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+            from transformers import AutoTokenizer
+
+            model_dir = os.path.join(cache_dir, model_name.replace("/", "--") + "-int8")
+
+            if not os.path.exists(os.path.join(model_dir, "model_quantized.onnx")):
+                logger.info(f"Exporting and quantizing {model_name} to {model_dir}")
+                model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+                model.save_pretrained(model_dir)
+                AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+
+                quantizer = ORTQuantizer.from_pretrained(model)
+                qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+                quantizer.quantize(save_dir=model_dir, quantization_config=qconfig)
+
+            model = ORTModelForSequenceClassification.from_pretrained(
+                model_dir, file_name="model_quantized.onnx"
+            )
+            return pipeline(
+                "zero-shot-classification",
+                model=model,
+                tokenizer=AutoTokenizer.from_pretrained(model_dir)
+            )
+
+        except Exception as e:
+            logger.warning(f"ONNX classifier unavailable, using PyTorch: {e}")
+            return None
+
     def classify(self, text: str, max_length: int = 1024) -> Dict[str, any]:
         """
         Classify a document based on its text content.
@@ -77,32 +148,69 @@ class DocumentClassifier:
                 hypothesis_template="This document is a {}."
             )
 
-            # Extract results
-            label = result["labels"][0]
-            confidence = result["scores"][0]
-            all_scores = dict(zip(result["labels"], result["scores"]))
-
-            return {
-                "label": label,
-                "confidence": round(confidence, 4),
-                "all_scores": {k: round(v, 4) for k, v in all_scores.items()}
-            }
+            return self._format_result(result)
 
         except Exception as e:
             logger.error(f"Classification error: {e}")
-            return {"label": "other", "confidence": 0.0, "all_scores": {}}
+            return {"label": "other", "confidence": 0.0, "all_scores": {}, "error": True}
 
-    def batch_classify(self, texts: list) -> list:
+    def batch_classify(self, texts: list, max_length: int = 1024, batch_size: int = 16) -> list:
         """
         Classify multiple documents in batch.
 
+        All non-empty texts go to the pipeline in one call, which runs them
+        through the model in batches of batch_size.
+
         Args:
             texts: List of document texts
+            max_length: Maximum characters to use per document
+            batch_size: Documents per forward pass
 
         Returns:
-            List of classification results
+            List of classification results, in input order
         """
-        return [self.classify(text) for text in texts]
+        results = [{"label": "other", "confidence": 0.0, "all_scores": {}} for _ in texts]
+        if not self.classifier:
+            return results
+
+        truncated = [text[:max_length] for text in texts]
+        indices = [i for i, text in enumerate(truncated) if text.strip()]
+        if not indices:
+            return results
+
+        try:
+            outputs = self.classifier(
+                [truncated[i] for i in indices],
+                candidate_labels=self.categories,
+                hypothesis_template="This document is a {}.",
+                batch_size=batch_size
+            )
+        except Exception as e:
+            logger.error(f"Batch classification error: {e}")
+            for i in indices:
+                results[i]["error"] = True
+            return results
+
+        # A single-item batch comes back unwrapped
+        if isinstance(outputs, dict):
+            outputs = [outputs]
+
+        for i, output in zip(indices, outputs):
+            results[i] = self._format_result(output)
+
+        return results
+
+    def _format_result(self, result: dict) -> Dict[str, any]:
+        """Convert a pipeline output into our classification result shape."""
+        label = result["labels"][0]
+        confidence = result["scores"][0]
+        all_scores = dict(zip(result["labels"], result["scores"]))
+
+        return {
+            "label": label,
+            "confidence": round(confidence, 4),
+            "all_scores": {k: round(v, 4) for k, v in all_scores.items()}
+        }
 
 
 # Fallback classifier using keyword matching (no ML dependency)
@@ -121,16 +229,40 @@ class KeywordClassifier:
         "memo": ["memo", "memorandum", "to:", "from:", "subject:", "re:"],
     }
 
+    # Built once per process; see _build_automaton
+    _automaton = None
+
+    @classmethod
+    def _build_automaton(cls):
+        """Compile every keyword into one Aho-Corasick automaton."""
+        automaton = ahocorasick.Automaton()
+        for category, keywords in cls.KEYWORDS.items():
+            for kw in keywords:
+                automaton.add_word(kw, (category, kw))
+        automaton.make_automaton()
+        return automaton
+
     def classify(self, text: str) -> Dict[str, any]:
         """
         Classify document using keyword matching.
+        Each keyword counts once, however often it appears.
         """
         text_lower = text.lower()
-        scores = {}
+        scores = dict.fromkeys(self.KEYWORDS, 0)
+
+        if ahocorasick is not None:
+            if KeywordClassifier._automaton is None:
+                KeywordClassifier._automaton = self._build_automaton()
 
-        for category, keywords in self.KEYWORDS.items():
-            score = sum(1 for kw in keywords if kw in text_lower)
-            scores[category] = score
+            # Single pass over the text; overlapping matches are reported too
+            seen = set()
+            for _, (category, kw) in KeywordClassifier._automaton.iter(text_lower):
+                if kw not in seen:
+                    seen.add(kw)
+                    scores[category] += 1
+        else:
+            for category, keywords in self.KEYWORDS.items():
+                scores[category] = sum(1 for kw in keywords if kw in text_lower)
 
         if max(scores.values()) == 0:
             return {"label": "other", "confidence": 0.5, "all_scores": scores}
@@ -4,41 +4,109 @@ Extracts entities like names, organizations, dates, and monetary values from doc
 """
 
 import spacy
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional, Tuple
 import logging
 import re
+import threading
+
+try:
+    import hyperscan
+except ImportError:  # Optional: regex prefilter falls back to plain re
+    hyperscan = None
 
 logger = logging.getLogger(__name__)
 
+# Patterns for entities spaCy tends to miss
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+PHONE_PATTERN = re.compile(r'\b(?:\+?1[-.\s]?)?\(?[0-9]{3}\)?[-.\s]?[0-9]{3}[-.\s]?[0-9]{4}\b')  # US format
+REF_PATTERN = re.compile(r'\b(?:INV|REF|PO|ORDER)[#\-]?\s*[A-Z0-9]{4,12}\b', re.IGNORECASE)
+
+# (type, original_type, pattern, confidence), in output order
+CUSTOM_PATTERNS = [
+    ("EMAIL", "EMAIL", EMAIL_PATTERN, 0.95),
+    ("PHONE", "PHONE", PHONE_PATTERN, 0.90),
+    ("REFERENCE_NUMBER", "REFERENCE", REF_PATTERN, 0.85),
+]
+
+# Python treats \x1c-\x1f as whitespace but Hyperscan doesn't; map them to spaces
+_HS_WHITESPACE = bytes.maketrans(b"\x1c\x1d\x1e\x1f", b"    ")
+
+# Long texts go through spaCy in pieces of about this many characters
+CHUNK_SIZE = 10000
+
+# Only doc.ents is used; NER in the English pipelines needs tok2vec but not these
+UNUSED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer"]
+
+
+def _chunk_text(text: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, int]]:
+    """
+    Split text into (chunk, offset) pieces of at most chunk_size characters.
+
+    Cuts at the last paragraph break in range, else the last space, so
+    entities are rarely split across chunks.
+    """
+    start, length = 0, len(text)
+
+    while start < length:
+        end = min(start + chunk_size, length)
+        if end < length:
+            cut = text.rfind("\n\n", start, end)
+            if cut <= start:
+                cut = text.rfind(" ", start, end)
+            if cut > start:
+                end = cut
+
+        chunk = text[start:end]
+        if chunk.strip():
+            yield chunk, start
+        start = end
+
 
 class EntityExtractor:
     """
     Extract named entities from document text using spaCy.
     """
 
-    def __init__(self, model_name: str = "en_core_web_sm"):
+    def __init__(self, model_name: str = "en_core_web_sm", use_gpu: bool = False):
         """
         Initialize the entity extractor with a spaCy model.
 
         Args:
             model_name: spaCy model to use. Default is the small English model.
+            use_gpu: Run the model on GPU when one is available (worth it
+                     for transformer pipelines such as en_core_web_trf)
         """
+        if use_gpu and not spacy.prefer_gpu():
+            logger.warning("use_gpu is set but no GPU is available to spaCy; using CPU")
+
         logger.info(f"Loading spaCy model: {model_name}")
         try:
-            self.nlp = spacy.load(model_name)
+            self.nlp = spacy.load(model_name, disable=UNUSED_PIPES)
             logger.info("spaCy model loaded successfully")
         except OSError:
             logger.warning(f"Model {model_name} not found. Downloading...")
             spacy.cli.download(model_name)
-            self.nlp = spacy.load(model_name)
+            self.nlp = spacy.load(model_name, disable=UNUSED_PIPES)
 
-    def extract(self, text: str, max_length: int = 100000) -> List[Dict]:
+        self._hs_db = self._compile_prefilter()
+        self._hs_local = threading.local()  # Hyperscan scratch is per thread
+
+    def extract(
+        self,
+        text: str,
+        max_length: Optional[int] = None,
+        chunk_size: int = CHUNK_SIZE
+    ) -> List[Dict]:
         """
         Extract named entities from text.
 
+        Long texts are fed to spaCy in paragraph-aligned chunks with
+        nlp.pipe, so memory stays bounded and nothing is silently dropped.
+
         Args:
             text: Document text to process
-            max_length: Maximum text length to process
+            max_length: Optional cap on the text length to process
+            chunk_size: Approximate characters per spaCy doc
 
         Returns:
             List of entity dictionaries with type, value, and confidence
@@ -46,15 +114,64 @@ class EntityExtractor:
         if not text or not text.strip():
             return []
 
-        # Truncate if necessary (spaCy has limits)
-        if len(text) > max_length:
+        if max_length is not None and len(text) > max_length:
             text = text[:max_length]
 
         try:
-            doc = self.nlp(text)
-            entities = []
-            seen = set()  # Avoid duplicates
+            docs = self.nlp.pipe(_chunk_text(text, chunk_size), as_tuples=True, batch_size=8)
+            return self._collect_entities(docs, text)
+
+        except Exception as e:
+            logger.error(f"Entity extraction error: {e}")
+            return []
+
+    def extract_batch(
+        self,
+        texts: List[str],
+        max_length: int = 100000,
+        batch_size: int = 64,
+        n_process: int = 1
+    ) -> List[List[Dict]]:
+        """
+        Extract named entities from many texts with nlp.pipe.
+
+        Args:
+            texts: Document texts to process
+            max_length: Maximum text length to process per document
+            batch_size: Texts per spaCy batch
+            n_process: Worker processes for spaCy (1 keeps it in-process)
+
+        Returns:
+            One entity list per input text, in input order
+        """
+        results = [[] for _ in texts]
+        pending = [
+            (text[:max_length], i) for i, text in enumerate(texts)
+            if text and text.strip()
+        ]
+
+        try:
+            for doc, i in self.nlp.pipe(
+                pending, as_tuples=True, batch_size=batch_size, n_process=n_process
+            ):
+                results[i] = self._collect_entities([(doc, 0)], texts[i][:max_length])
+        except Exception as e:
+            logger.error(f"Batch entity extraction error: {e}")
+
+        return results
+
+    def _collect_entities(self, docs, text: str) -> List[Dict]:
+        """
+        Build entity dicts from processed spaCy docs plus the regex patterns.
+
+        Args:
+            docs: (doc, offset) pairs, offset being where each doc starts in text
+            text: The full text the docs were cut from
+        """
+        entities = []
+        seen = set()  # Avoid duplicates
 
+        for doc, offset in docs:
             for ent in doc.ents:
                 # Create unique key to avoid duplicates
                 key = (ent.label_, ent.text.strip().lower())
@@ -66,21 +183,17 @@ class EntityExtractor:
                     "type": self._map_entity_type(ent.label_),
                     "value": ent.text.strip(),
                     "original_type": ent.label_,
-                    "start": ent.start_char,
-                    "end": ent.end_char,
+                    "start": ent.start_char + offset,
+                    "end": ent.end_char + offset,
                     "confidence": 0.85  # spaCy doesn't provide confidence, using default
                 }
                 entities.append(entity)
 
-            # Also extract custom patterns (emails, phone numbers, etc.)
-            custom_entities = self._extract_custom_patterns(text)
-            entities.extend(custom_entities)
+        # Also extract custom patterns (emails, phone numbers, etc.)
+        custom_entities = self._extract_custom_patterns(text)
+        entities.extend(custom_entities)
 
-            return entities
-
-        except Exception as e:
-            logger.error(f"Entity extraction error: {e}")
-            return []
+        return entities
 
     def _map_entity_type(self, spacy_type: str) -> str:
         """
@@ -108,47 +221,72 @@ class EntityExtractor:
         }
         return mapping.get(spacy_type, "OTHER")
 
+    def _compile_prefilter(self):
+        """
+        Compile all custom patterns into one Hyperscan database, if available.
+        """
+        if hyperscan is None:
+            return None
+
+        try:
+            db = hyperscan.Database()
+            db.compile(
+                expressions=[p.pattern.encode() for _, _, p, _ in CUSTOM_PATTERNS],
+                ids=list(range(len(CUSTOM_PATTERNS))),
+                elements=len(CUSTOM_PATTERNS),
+                flags=[
+                    hyperscan.HS_FLAG_SINGLEMATCH
+                    | (hyperscan.HS_FLAG_CASELESS if p.flags & re.IGNORECASE else 0)
+                    for _, _, p, _ in CUSTOM_PATTERNS
+                ],
+            )
+            return db
+        except Exception as e:
+            logger.warning(f"Hyperscan unavailable, using re only: {e}")
+            return None
+
+    def _patterns_present(self, text: str) -> List[int]:
+        """
+        Indexes of CUSTOM_PATTERNS that match somewhere in the text.
+
+        Uses a single Hyperscan pass for ASCII text (where its word-boundary
+        and whitespace classes agree with Python's); otherwise every pattern
+        is a candidate.
+        """
+        if self._hs_db is None or not text.isascii():
+            return list(range(len(CUSTOM_PATTERNS)))
+
+        scratch = getattr(self._hs_local, "scratch", None)
+        if scratch is None:
+            scratch = self._hs_local.scratch = hyperscan.Scratch(self._hs_db)
+
+        found = set()
+
+        def on_match(pattern_id, start, end, flags, context):
+            found.add(pattern_id)
+
+        data = text.encode("ascii").translate(_HS_WHITESPACE)
+        self._hs_db.scan(data, match_event_handler=on_match, scratch=scratch)
+        return sorted(found)
+
     def _extract_custom_patterns(self, text: str) -> List[Dict]:
         """
         Extract entities using regex patterns for things spaCy might miss.
+        Patterns the prefilter rules out are never run.
         """
         entities = []
 
-        # Email pattern
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        for match in re.finditer(email_pattern, text):
-            entities.append({
-                "type": "EMAIL",
-                "value": match.group(),
-                "original_type": "EMAIL",
-                "start": match.start(),
-                "end": match.end(),
-                "confidence": 0.95
-            })
-
-        # Phone number pattern (US format)
-        phone_pattern = r'\b(?:\+?1[-.\s]?)?\(?[0-9]{3}\)?[-.\s]?[0-9]{3}[-.\s]?[0-9]{4}\b'
-        for match in re.finditer(phone_pattern, text):
-            entities.append({
-                "type": "PHONE",
-                "value": match.group(),
-                "original_type": "PHONE",
-                "start": match.start(),
-                "end": match.end(),
-                "confidence": 0.90
-            })
-
-        # Invoice/Reference number pattern
-        ref_pattern = r'\b(?:INV|REF|PO|ORDER)[#\-]?\s*[A-Z0-9]{4,12}\b'
-        for match in re.finditer(ref_pattern, text, re.IGNORECASE):
-            entities.append({
-                "type": "REFERENCE_NUMBER",
-                "value": match.group(),
-                "original_type": "REFERENCE",
-                "start": match.start(),
-                "end": match.end(),
-                "confidence": 0.85
-            })
+        for i in self._patterns_present(text):
+            entity_type, original_type, pattern, confidence = CUSTOM_PATTERNS[i]
+            for match in pattern.finditer(text):
+                entities.append({
+                    "type": entity_type,
+                    "value": match.group(),
+                    "original_type": original_type,
+                    "start": match.start(),
+                    "end": match.end(),
+                    "confidence": confidence
+                })
 
         return entities
 
@@ -4,31 +4,95 @@ Extracts text from images and scanned PDFs.
 """
 
 import pytesseract
+import fitz  # PyMuPDF
 from PIL import Image
-from pdf2image import convert_from_bytes
-from PyPDF2 import PdfReader
+from concurrent.futures import ThreadPoolExecutor
 import io
+import os
+import threading
 from typing import Optional
 import logging
 
+try:
+    import tesserocr
+except ImportError:  # Optional: falls back to the pytesseract CLI wrapper
+    tesserocr = None
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # Optional: upscaling falls back to Pillow
+    cv2 = None
+
 logger = logging.getLogger(__name__)
 
+# Pages are OCR'd in parallel (Tesseract releases the GIL while recognizing)
+OCR_WORKERS = os.cpu_count() or 1
+
 
 class OCRProcessor:
     """
     Extract text from images and PDFs using Tesseract OCR.
     """
 
-    def __init__(self, tesseract_cmd: Optional[str] = None):
+    def __init__(self, tesseract_cmd: Optional[str] = None, max_workers: int = OCR_WORKERS):
         """
         Initialize OCR processor.
 
+        Create one per application and reuse it; it owns the page worker pool.
+
         Args:
             tesseract_cmd: Path to Tesseract executable (if not in PATH)
+            max_workers: Threads used to OCR PDF pages in parallel
         """
         if tesseract_cmd:
             pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
 
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr")
+
+        # With tesserocr, each thread keeps one loaded Tesseract engine
+        # (PyTessBaseAPI isn't thread-safe) instead of spawning the CLI per page
+        self._use_tesserocr = tesserocr is not None
+        self._local = threading.local()
+        self._apis = []
+        self._apis_lock = threading.Lock()
+
+    def close(self):
+        """Shut down the page worker pool and release Tesseract engines."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._apis_lock:
+            for api in self._apis:
+                api.End()
+            self._apis.clear()
+
+    def _get_api(self):
+        """Get this thread's PyTessBaseAPI, creating it on first use."""
+        api = getattr(self._local, "api", None)
+        if api is None:
+            # tessdata is located via TESSDATA_PREFIX
+            api = tesserocr.PyTessBaseAPI(lang="eng", oem=tesserocr.OEM.LSTM_ONLY)
+            self._local.api = api
+            with self._apis_lock:
+                self._apis.append(api)
+        return api
+
+    def _image_to_string(self, image: Image.Image) -> str:
+        """
+        Run Tesseract on a preprocessed image.
+        """
+        if self._use_tesserocr:
+            try:
+                api = self._get_api()
+            except RuntimeError as e:
+                logger.warning(f"tesserocr unavailable, using pytesseract: {e}")
+                self._use_tesserocr = False
+            else:
+                api.SetImage(image)
+                return api.GetUTF8Text()
+
+        return pytesseract.image_to_string(image, lang='eng')
+
     def extract_from_image(self, image_bytes: bytes) -> str:
         """
         Extract text from an image file.
@@ -46,7 +110,7 @@ class OCRProcessor:
             image = self._preprocess_image(image)
 
             # Run OCR
-            text = pytesseract.image_to_string(image, lang='eng')
+            text = self._image_to_string(image)
 
             return text.strip()
 
@@ -54,25 +118,27 @@ class OCRProcessor:
             logger.error(f"Image OCR error: {e}")
             return ""
 
-    def extract_from_pdf(self, pdf_bytes: bytes) -> str:
+    def extract_from_pdf(self, pdf_bytes: bytes, max_chars: Optional[int] = None) -> str:
         """
         Extract text from a PDF file.
         First tries direct text extraction, falls back to OCR if needed.
 
         Args:
             pdf_bytes: Raw PDF bytes
+            max_chars: Stop after the page that brings the text past this
+                       many characters (None reads every page)
 
         Returns:
             Extracted text string
         """
         try:
             # First try direct text extraction (for text-based PDFs)
-            text = self._extract_pdf_text(pdf_bytes)
+            text = self._extract_pdf_text(pdf_bytes, max_chars)
 
             # If no text found, use OCR
             if not text.strip():
                 logger.info("PDF has no text layer, using OCR...")
-                text = self._ocr_pdf(pdf_bytes)
+                text = self._ocr_pdf(pdf_bytes, max_chars)
 
             return text.strip()
 
@@ -80,18 +146,22 @@ class OCRProcessor:
             logger.error(f"PDF extraction error: {e}")
             return ""
 
-    def _extract_pdf_text(self, pdf_bytes: bytes) -> str:
+    def _extract_pdf_text(self, pdf_bytes: bytes, max_chars: Optional[int] = None) -> str:
         """
         Extract text directly from PDF (for text-based PDFs).
         """
         try:
-            reader = PdfReader(io.BytesIO(pdf_bytes))
             text_parts = []
+            total = 0
 
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text_parts.append(page_text)
+            with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+                for page in doc:
+                    part = page.get_text()
+                    if part:
+                        text_parts.append(part)
+                        total += len(part)
+                    if max_chars is not None and total >= max_chars:
+                        break
 
             return "\n".join(text_parts)
 
@@ -99,20 +169,36 @@ class OCRProcessor:
             logger.error(f"PDF text extraction error: {e}")
             return ""
 
-    def _ocr_pdf(self, pdf_bytes: bytes) -> str:
+    def _ocr_pdf(self, pdf_bytes: bytes, max_chars: Optional[int] = None) -> str:
         """
-        Convert PDF pages to images and run OCR.
+        Render PDF pages to images and run OCR, one page per worker thread.
+        With max_chars, pages are done one worker-pool's worth at a time so
+        the rest can be skipped once enough text is in.
         """
         try:
-            # Convert PDF to images
-            images = convert_from_bytes(pdf_bytes, dpi=200)
             text_parts = []
+            total = 0
 
-            for i, image in enumerate(images):
-                logger.info(f"OCR processing page {i + 1}/{len(images)}")
-                image = self._preprocess_image(image)
-                page_text = pytesseract.image_to_string(image, lang='eng')
-                text_parts.append(page_text)
+            # Render in this thread (MuPDF documents aren't thread-safe),
+            # straight to grayscale so preprocessing can skip the conversion
+            with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+                page_count = doc.page_count
+                wave_size = self.max_workers if max_chars is not None else max(page_count, 1)
+                logger.info(f"OCR processing {page_count} pages")
+
+                for start in range(0, page_count, wave_size):
+                    images = []
+                    for page in doc.pages(start, min(start + wave_size, page_count)):
+                        pix = page.get_pixmap(dpi=200, colorspace=fitz.csGRAY)
+                        images.append(Image.frombytes("L", (pix.width, pix.height), pix.samples))
+
+                    for part in self._executor.map(self._ocr_page, images):
+                        text_parts.append(part)
+                        total += len(part)
+
+                    if max_chars is not None and total >= max_chars:
+                        logger.info(f"Stopping OCR after {start + len(images)} pages ({total} characters)")
+                        break
 
             return "\n".join(text_parts)
 
@@ -120,6 +206,13 @@ class OCRProcessor:
             logger.error(f"PDF OCR error: {e}")
             return ""
 
+    def _ocr_page(self, image: Image.Image) -> str:
+        """
+        Preprocess and OCR a single rendered page.
+        """
+        image = self._preprocess_image(image)
+        return self._image_to_string(image)
+
     def _preprocess_image(self, image: Image.Image) -> Image.Image:
         """
         Preprocess image for better OCR accuracy.
@@ -133,23 +226,30 @@ class OCRProcessor:
         if image.width < min_width:
             ratio = min_width / image.width
             new_size = (int(image.width * ratio), int(image.height * ratio))
-            image = image.resize(new_size, Image.Resampling.LANCZOS)
+
+            if cv2 is not None:
+                # Vectorized Lanczos that runs without the GIL, so page workers scale
+                resized = cv2.resize(np.asarray(image), new_size, interpolation=cv2.INTER_LANCZOS4)
+                image = Image.fromarray(resized)
+            else:
+                image = image.resize(new_size, Image.Resampling.LANCZOS)
 
         return image
 
-    def extract_text(self, file_bytes: bytes, mime_type: str) -> str:
+    def extract_text(self, file_bytes: bytes, mime_type: str, max_chars: Optional[int] = None) -> str:
         """
         Extract text from file based on MIME type.
 
         Args:
             file_bytes: Raw file bytes
             mime_type: File MIME type
+            max_chars: For PDFs, stop reading pages once this much text is in
 
         Returns:
             Extracted text
         """
         if mime_type == "application/pdf":
-            return self.extract_from_pdf(file_bytes)
+            return self.extract_from_pdf(file_bytes, max_chars)
         elif mime_type.startswith("image/"):
             return self.extract_from_image(file_bytes)
         elif mime_type in ["text/plain", "text/html", "text/csv"]:
@@ -3,15 +3,94 @@ Document Processing Pipeline.
 Orchestrates OCR, classification, and entity extraction.
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+from cachetools import LRUCache
+import asyncio
+import hashlib
 import logging
 
 from app.ml.ocr import OCRProcessor
 from app.ml.classifier import DocumentClassifier, KeywordClassifier
 from app.ml.ner import EntityExtractor
+from app.ml.batching import MicroBatcher
 
 logger = logging.getLogger(__name__)
 
+# Identical inputs (re-uploads, templates, retries) give identical outputs, so
+# recent results are memoized by content digest. Only touched from the event
+# loop thread; models are loaded once per process, so entries never go stale.
+RESULT_CACHE_SIZE = 4096
+_result_cache = LRUCache(maxsize=RESULT_CACHE_SIZE)  # (file digest, mime type) -> result
+_classification_cache = LRUCache(maxsize=RESULT_CACHE_SIZE)  # text digest -> classification
+_entity_cache = LRUCache(maxsize=RESULT_CACHE_SIZE)  # text digest -> entities
+
+# PDF pages past this much text are not read (classification only looks at
+# the first KB; NER and search get plenty from the leading pages)
+MAX_TEXT_CHARS = 200_000
+
+# Used when a caller doesn't pass its own OCRProcessor; created on first use
+# and kept for the life of the process (it owns a thread pool)
+_default_ocr: Optional[OCRProcessor] = None
+
+
+def _digest(data: bytes) -> bytes:
+    """Content key for the result caches."""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _get_default_ocr() -> OCRProcessor:
+    global _default_ocr
+    if _default_ocr is None:
+        _default_ocr = OCRProcessor()
+    return _default_ocr
+
+
+def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a cached result so callers can't mutate the cached entities or scores."""
+    copy = {**result, "entities": [dict(e) for e in result["entities"]]}
+    if "all_classifications" in result:
+        copy["all_classifications"] = dict(result["all_classifications"])
+    return copy
+
+
+def _is_cacheable(classification: Dict[str, Any]) -> bool:
+    """
+    Whether a classification can be memoized. Model errors come back as
+    "other" with zero confidence, which must not stick to the content.
+    """
+    return not classification.get("error") and classification["confidence"] > 0.0
+
+
+async def _classify(
+    text_key: bytes,
+    text: str,
+    classifier: DocumentClassifier,
+    classify_batcher: Optional[MicroBatcher] = None
+) -> Dict[str, Any]:
+    """Classify text, reusing the cached result for identical text."""
+    result = _classification_cache.get(text_key)
+    if result is None:
+        if classify_batcher:
+            result = await classify_batcher.submit(text)
+        else:
+            result = await asyncio.to_thread(classifier.classify, text)
+        if _is_cacheable(result):
+            _classification_cache[text_key] = result
+    return result
+
+
+async def _extract_entities(
+    text_key: bytes,
+    text: str,
+    entity_extractor: EntityExtractor
+) -> List[Dict]:
+    """Extract entities from text, reusing the cached result for identical text."""
+    entities = _entity_cache.get(text_key)
+    if entities is None:
+        entities = await asyncio.to_thread(entity_extractor.extract, text)
+        _entity_cache[text_key] = entities
+    return [dict(e) for e in entities]
+
 
 async def process_document(
     document_id: str,
@@ -19,7 +98,9 @@ async def process_document(
     content: bytes,
     mime_type: str,
     classifier: DocumentClassifier,
-    entity_extractor: EntityExtractor
+    entity_extractor: EntityExtractor,
+    classify_batcher: Optional[MicroBatcher] = None,
+    ocr: Optional[OCRProcessor] = None
 ) -> Dict[str, Any]:
     """
     Full document processing pipeline.
@@ -37,16 +118,31 @@ async def process_document(
         mime_type: File MIME type
         classifier: DocumentClassifier instance
         entity_extractor: EntityExtractor instance
+        classify_batcher: Optional MicroBatcher over classifier.batch_classify;
+                          when given, classification is batched with other
+                          concurrent documents
+        ocr: Shared OCRProcessor (a process-wide one is used if omitted)
 
     Returns:
         Processed document data including text, classification, and entities
+
+    OCR, classification and NER are blocking, so each runs in a worker
+    thread to keep the event loop free for other requests.
     """
     logger.info(f"Processing document {document_id} ({mime_type})")
 
+    # Same bytes seen recently: skip the whole pipeline
+    content_key = (_digest(content), mime_type)
+    cached = _result_cache.get(content_key)
+    if cached is not None:
+        logger.info(f"Reusing cached processing result for document {document_id}")
+        return _copy_result(cached)
+
     # Step 1: Extract text
-    ocr = OCRProcessor()
-    text = ocr.extract_text(content, mime_type)
+    ocr = ocr or _get_default_ocr()
+    text = await asyncio.to_thread(ocr.extract_text, content, mime_type, MAX_TEXT_CHARS)
 
+    # Not cached: OCR errors are also reported as empty text
     if not text.strip():
         logger.warning(f"No text extracted from document {document_id}")
         return {
@@ -59,23 +155,32 @@ async def process_document(
 
     logger.info(f"Extracted {len(text)} characters from document")
 
-    # Step 2: Classify document
-    try:
-        classification_result = classifier.classify(text)
-    except Exception as e:
-        logger.error(f"Classification failed, using keyword fallback: {e}")
+    text_key = _digest(text.encode())
+
+    # Steps 2 and 3: Classify document and extract entities. Both only
+    # need the text, so they run side by side on separate threads.
+    classification_result, entities = await asyncio.gather(
+        _classify(text_key, text, classifier, classify_batcher),
+        _extract_entities(text_key, text, entity_extractor),
+        return_exceptions=True
+    )
+
+    if isinstance(entities, BaseException):
+        raise entities
+
+    used_fallback = False
+    if isinstance(classification_result, Exception):
+        logger.error(f"Classification failed, using keyword fallback: {classification_result}")
         fallback = KeywordClassifier()
         classification_result = fallback.classify(text)
+        used_fallback = True
 
     logger.info(f"Classified as: {classification_result['label']} "
                 f"(confidence: {classification_result['confidence']})")
-
-    # Step 3: Extract entities
-    entities = entity_extractor.extract(text)
     logger.info(f"Extracted {len(entities)} entities")
 
     # Step 4: Return processed data
-    return {
+    result = {
         "text": text,
         "classification": classification_result["label"],
         "confidence": classification_result["confidence"],
@@ -85,6 +190,11 @@ async def process_document(
         "status": "processed"
     }
 
+    # Don't pin a fallback or failed classification in the cache
+    if not used_fallback and _is_cacheable(classification_result):
+        _result_cache[content_key] = result
+    return _copy_result(result)
+
 
 async def reprocess_document(
     document_id: str,
@@ -96,8 +206,11 @@ async def reprocess_document(
     Reprocess an existing document (when models are updated).
     Skips OCR since text is already extracted.
     """
-    classification_result = classifier.classify(text)
-    entities = entity_extractor.extract(text)
+    text_key = _digest(text.encode())
+    classification_result, entities = await asyncio.gather(
+        _classify(text_key, text, classifier),
+        _extract_entities(text_key, text, entity_extractor)
+    )
 
     return {
         "classification": classification_result["label"],
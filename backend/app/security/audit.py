@@ -3,18 +3,39 @@ Audit Logging System.
 Records all security-relevant actions for compliance and debugging.
 """
 
-from datetime import datetime
-from typing import Optional
+from typing import Optional, List
+from bisect import bisect_left, bisect_right
 import logging
+import sys
 import uuid
+import orjson
+
+from app.config import settings
+from app.security.audit_buffer import enqueue
+from app.services.pagination import encode_position, decode_position, take_window
+from app.services.timestamps import parse_timestamp, utc_now
 
 logger = logging.getLogger(__name__)
 
-# In-memory store for development (replace with database in production)
+# In-memory store for development (replace with database in production).
+# Only the newest AUDIT_RETENTION entries are kept.
+AUDIT_RETENTION = settings.audit_retention
 _audit_logs = []
 
+# created_at_ts (epoch seconds) of each entry, parallel to _audit_logs,
+# for binary search on date ranges
+_audit_created_at = []
+
+# Number of entries dropped from the front of _audit_logs so far.
+# Entry positions are absolute: position p lives at _audit_logs[p - _audit_offset]
+_audit_offset = 0
+
+# Positions (ascending) for the selective filters
+_audit_by_user = {}
+_audit_by_action = {}
+
 
-async def log_action(
+def log_action(
     user_id: str,
     action: str,
     resource_type: Optional[str] = None,
@@ -25,6 +46,9 @@ async def log_action(
     """
     Log a security-relevant action.
 
+    Does not wait on storage: the entry is queued and written in the next
+    batch by the audit buffer's flush task.
+
     Args:
         user_id: ID of the user performing the action
         action: Action type (e.g., USER_LOGIN, DOCUMENT_UPLOADED)
@@ -36,6 +60,13 @@ async def log_action(
     Returns:
         Created audit log entry
     """
+    created_at, created_at_ts = utc_now()
+
+    # Actions and resource types come from small fixed sets, so share
+    # one string object per value across all stored entries
+    action = sys.intern(action)
+    resource_type = sys.intern(resource_type) if resource_type else resource_type
+
     log_entry = {
         "id": str(uuid.uuid4()),
         "user_id": user_id,
@@ -44,64 +75,148 @@ async def log_action(
         "resource_id": resource_id,
         "details": details or {},
         "ip_address": ip_address,
-        "created_at": datetime.utcnow().isoformat()
+        "created_at": created_at,
+        "created_at_ts": created_at_ts
     }
 
-    # Store log (in production, this would go to database)
-    _audit_logs.append(log_entry)
+    # Queue for batched storage (see store_entries)
+    enqueue(log_entry)
 
-    # Also log to standard logger
+    # Also log to standard logger (formatted only if INFO is enabled)
     logger.info(
-        f"AUDIT: {action} by user {user_id} "
-        f"on {resource_type}/{resource_id} - {details}"
+        "AUDIT: %s by user %s on %s/%s - %s",
+        action, user_id, resource_type, resource_id, details
     )
 
     return log_entry
 
 
-async def get_audit_logs(
+def store_entries(entries: List[dict]) -> None:
+    """
+    Persist a batch of audit entries.
+    In production, this would be a single multi-row INSERT.
+    """
+    base = _audit_offset + len(_audit_logs)
+    _audit_logs.extend(entries)
+    _audit_created_at.extend(entry["created_at_ts"] for entry in entries)
+
+    for i, entry in enumerate(entries, base):
+        _audit_by_user.setdefault(entry["user_id"], []).append(i)
+        _audit_by_action.setdefault(entry["action"], []).append(i)
+
+    if len(_audit_logs) > AUDIT_RETENTION:
+        _trim(len(_audit_logs) - AUDIT_RETENTION)
+
+
+def archive_entries(entries: List[dict]) -> None:
+    """
+    Append a batch to the audit_log_path JSON lines file in one write.
+    Blocking: the audit buffer runs it in a worker thread.
+    """
+    data = b"".join(orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE) for entry in entries)
+    with open(settings.audit_log_path, "ab") as f:
+        f.write(data)
+
+
+def _trim(count: int) -> None:
+    """Drop the oldest `count` entries and their index positions."""
+    global _audit_offset
+
+    del _audit_logs[:count]
+    del _audit_created_at[:count]
+    _audit_offset += count
+
+    for index in (_audit_by_user, _audit_by_action):
+        for key in list(index):
+            positions = index[key]
+            del positions[:bisect_left(positions, _audit_offset)]
+            if not positions:
+                del index[key]
+
+
+def get_audit_logs(
     user_id: Optional[str] = None,
     action: Optional[str] = None,
     resource_type: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
     page: int = 1,
-    page_size: int = 50
+    page_size: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = False
 ) -> tuple:
     """
-    Retrieve audit logs with filtering.
+    Retrieve audit logs with filtering, newest first.
+
+    Pass the previous page's next_cursor as `cursor` for keyset
+    pagination; otherwise `page` is used as an offset. The total count
+    is only computed when include_total is set.
 
     Returns:
-        Tuple of (logs list, total count)
-    """
-    filtered_logs = _audit_logs.copy()
+        Tuple of (logs list, total count or None, next_cursor or None)
 
-    # Apply filters
+    Raises:
+        ValueError if the cursor or a date is malformed
+    """
+    ts_from = parse_timestamp(date_from)
+    ts_to = parse_timestamp(date_to)
+    offset = _audit_offset
+
+    # Entries are stored in chronological order, so the date range is
+    # located by binary search: only [start, end) is visited
+    start = bisect_left(_audit_created_at, ts_from) if ts_from is not None else 0
+    end = bisect_right(_audit_created_at, ts_to) if ts_to is not None else len(_audit_logs)
+
+    # A cursor holds the absolute position of the previous page's last
+    # entry, so the walk starts just below it
+    seek = end
+    if cursor:
+        seek = min(end, max(decode_position(cursor) - offset, start))
+
+    # With a user or action filter, only visit that filter's entries
+    # (the smaller list if both are given)
+    positions = None
     if user_id:
-        filtered_logs = [l for l in filtered_logs if l["user_id"] == user_id]
-
+        positions = _audit_by_user.get(user_id, [])
     if action:
-        filtered_logs = [l for l in filtered_logs if l["action"] == action]
-
-    if resource_type:
-        filtered_logs = [l for l in filtered_logs if l["resource_type"] == resource_type]
-
-    if date_from:
-        filtered_logs = [l for l in filtered_logs if l["created_at"] >= date_from]
-
-    if date_to:
-        filtered_logs = [l for l in filtered_logs if l["created_at"] <= date_to]
-
-    # Sort by date descending
-    filtered_logs.sort(key=lambda x: x["created_at"], reverse=True)
-
-    # Paginate
-    total = len(filtered_logs)
-    start = (page - 1) * page_size
-    end = start + page_size
-    paginated = filtered_logs[start:end]
-
-    return paginated, total
+        by_action = _audit_by_action.get(action, [])
+        if positions is None or len(by_action) < len(positions):
+            positions = by_action
+
+    def matching(lo: int, hi: int):
+        # Indices of matching entries in [lo, hi), newest first
+        if positions is None:
+            indices = range(hi - 1, lo - 1, -1)
+        else:
+            first = bisect_left(positions, lo + offset)
+            last = bisect_left(positions, hi + offset)
+            indices = (positions[j] - offset for j in range(last - 1, first - 1, -1))
+
+        for i in indices:
+            log = _audit_logs[i]
+            if user_id and log["user_id"] != user_id:
+                continue
+            if action and log["action"] != action:
+                continue
+            if resource_type and log["resource_type"] != resource_type:
+                continue
+            yield i
+
+    # Paginate (fetch one extra entry to know if there is a next page)
+    skip = 0 if cursor else max(page - 1, 0) * page_size
+    window, total = take_window(matching(start, seek), skip, page_size + 1, count=include_total)
+    paginated = [_audit_logs[i] for i in window[:page_size]]
+
+    # The total covers the whole filtered range, including entries newer
+    # than the cursor
+    if total is not None and seek < end:
+        total += sum(1 for _ in matching(seek, end))
+
+    next_cursor = None
+    if len(window) > page_size:
+        next_cursor = encode_position(window[page_size - 1] + offset)
+
+    return paginated, total, next_cursor
 
 
 # Standard action types
@@ -0,0 +1,112 @@
+"""
+Audit Log Buffer.
+Queues audit entries off the request path and writes them in batches.
+"""
+
+from typing import Callable, List, Optional
+import asyncio
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Flush when this many entries are waiting, or every FLUSH_INTERVAL seconds
+BATCH_SIZE = settings.audit_batch_size
+FLUSH_INTERVAL = settings.audit_flush_interval
+
+# Bounded so a stalled writer can't grow memory without limit
+MAX_QUEUE_SIZE = 10000
+
+_queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_QUEUE_SIZE)
+
+# Set when a full batch is waiting; created by flush_loop on its own loop
+_batch_ready: Optional[asyncio.Event] = None
+
+
+def enqueue(entry: dict) -> bool:
+    """
+    Queue an audit entry for the next batch write.
+
+    Never waits. When the queue is full the entry is dropped (and logged)
+    rather than blocking the request that produced it.
+
+    Returns:
+        True if queued, False if dropped
+    """
+    try:
+        _queue.put_nowait(entry)
+    except asyncio.QueueFull:
+        logger.warning(f"Audit buffer full, dropping {entry['action']} entry")
+        return False
+
+    if _batch_ready and _queue.qsize() >= BATCH_SIZE:
+        _batch_ready.set()
+
+    return True
+
+
+def drain(sink: Callable[[List[dict]], None]) -> List[dict]:
+    """
+    Write every queued entry to the sink in batches of BATCH_SIZE.
+
+    Returns:
+        The entries written
+    """
+    written = []
+
+    while not _queue.empty():
+        batch = []
+        while len(batch) < BATCH_SIZE and not _queue.empty():
+            batch.append(_queue.get_nowait())
+
+        try:
+            sink(batch)
+            written.extend(batch)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} audit entries: {e}")
+
+    return written
+
+
+async def flush(
+    sink: Callable[[List[dict]], None],
+    archive: Optional[Callable[[List[dict]], None]] = None
+) -> int:
+    """
+    Drain the queue to the sink, then hand the written entries to the
+    (blocking) archive in a worker thread, off the event loop.
+
+    Returns:
+        Number of entries written
+    """
+    entries = drain(sink)
+
+    if archive and entries:
+        try:
+            await asyncio.to_thread(archive, entries)
+        except Exception as e:
+            logger.error(f"Failed to archive {len(entries)} audit entries: {e}")
+
+    return len(entries)
+
+
+async def flush_loop(
+    sink: Callable[[List[dict]], None],
+    archive: Optional[Callable[[List[dict]], None]] = None
+):
+    """
+    Background task that flushes the buffer to the sink (and archive).
+    Started from the application lifespan; runs until cancelled.
+    """
+    global _batch_ready
+    _batch_ready = asyncio.Event()
+
+    while True:
+        try:
+            await asyncio.wait_for(_batch_ready.wait(), timeout=FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+        _batch_ready.clear()
+        await flush(sink, archive)
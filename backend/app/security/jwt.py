@@ -4,8 +4,13 @@ Handles token creation, validation, and role-based access control.
 """
 
 from datetime import datetime, timedelta
-from typing import Optional, List, Callable
-from jose import JWTError, jwt
+from typing import Optional, Tuple, Callable
+from functools import lru_cache
+from cachetools import TLRUCache
+from jwt.exceptions import PyJWTError
+import hashlib
+import jwt
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
@@ -13,6 +18,23 @@ from app.config import settings
 
 # HTTP Bearer scheme for token extraction
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Verified tokens: blake2b(token) -> (payload, cache expiry). Validation is
+# purely offline (signature + exp), so a verified token is cached until its
+# exp, but for at most TOKEN_CACHE_TTL seconds: access tokens live for a day,
+# and the cap bounds how long one is trusted without verifying it again.
+# Invalid tokens are never cached. Refresh tokens get their own cache.
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 300
+
+
+def _token_expiry(key, value, now) -> float:
+    return value[1]
+
+
+_token_cache = TLRUCache(maxsize=TOKEN_CACHE_SIZE, ttu=_token_expiry, timer=time.time)
+_refresh_token_cache = TLRUCache(maxsize=TOKEN_CACHE_SIZE, ttu=_token_expiry, timer=time.time)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -59,22 +81,38 @@ def decode_token(token: str) -> dict:
 
     Raises:
         HTTPException if token is invalid or expired
+
+    The signature is only checked the first time a token is seen; after
+    that the payload is served from cache until the token expires or
+    TOKEN_CACHE_TTL passes, whichever comes first.
     """
+    return _decode_cached(token, _token_cache)
+
+
+def _decode_cached(token: str, cache: TLRUCache) -> dict:
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached[0]
+
     try:
         payload = jwt.decode(
             token,
             settings.jwt_secret,
             algorithms=[settings.jwt_algorithm]
         )
-        return payload
 
-    except JWTError as e:
+    except PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"}
         )
 
+    if "exp" in payload:
+        cache[key] = (payload, min(payload["exp"], time.time() + TOKEN_CACHE_TTL))
+    return payload
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
@@ -107,36 +145,41 @@ async def get_current_user(
     }
 
 
-def require_role(allowed_roles: List[str]) -> Callable:
+async def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[dict]:
+    """
+    Like get_current_user, but None when no bearer token is sent.
+    For routes that also accept another credential (e.g. a signed URL).
+    """
+    if credentials is None:
+        return None
+    return await get_current_user(credentials)
+
+
+@lru_cache(maxsize=16)
+def require_role(allowed_roles: Tuple[str, ...]) -> Callable:
     """
     Create a dependency that requires specific roles.
 
+    Cached, so every route requiring the same roles shares one dependency
+    (which FastAPI then resolves once per request). Roles must be a tuple.
+
     Usage:
         @router.post("/admin-only")
-        async def admin_route(current_user: dict = Depends(require_role(["admin"]))):
+        async def admin_route(current_user: dict = Depends(require_role(("admin",)))):
             ...
     """
-    async def role_checker(
-        credentials: HTTPAuthorizationCredentials = Depends(security)
-    ) -> dict:
-        token = credentials.credentials
-        payload = decode_token(token)
+    denied = f"Access denied. Required roles: {', '.join(allowed_roles)}"
 
-        user_id = payload.get("sub")
-        user_role = payload.get("role", "user")
-
-        if user_role not in allowed_roles:
+    async def role_checker(current_user: dict = Depends(get_current_user)) -> dict:
+        if current_user["role"] not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Access denied. Required roles: {', '.join(allowed_roles)}"
+                detail=denied
             )
 
-        return {
-            "id": user_id,
-            "role": user_role,
-            "email": payload.get("email", ""),
-            "full_name": payload.get("full_name", "")
-        }
+        return current_user
 
     return role_checker
 
@@ -147,7 +190,7 @@ def create_refresh_token(user_id: str) -> str:
     """
     return create_access_token(
         {"sub": user_id, "type": "refresh"},
-        expires_delta=timedelta(days=7)
+        expires_delta=timedelta(days=settings.jwt_refresh_expiration_days)
     )
 
 
@@ -155,7 +198,7 @@ def verify_refresh_token(token: str) -> str:
     """
     Verify a refresh token and return the user ID.
     """
-    payload = decode_token(token)
+    payload = _decode_cached(token, _refresh_token_cache)
 
     if payload.get("type") != "refresh":
         raise HTTPException(
@@ -4,11 +4,19 @@ User management and system administration operations.
 """
 
 from typing import Optional, List, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import sys
 
-from app.services.auth_service import _users
-from app.services.document_service import _documents
-from app.security.audit import _audit_logs
+from app.services.auth_service import _users, _users_by_email
+from app.services.document_service import (
+    _documents,
+    classification_counts,
+    remove_document,
+    store_version,
+    total_storage_bytes,
+    user_documents,
+)
+from app.security import audit
 
 
 class AdminService:
@@ -16,7 +24,7 @@ class AdminService:
     Service for admin operations.
     """
 
-    async def list_users(self, role: Optional[str] = None) -> List[dict]:
+    def list_users(self, role: Optional[str] = None) -> List[dict]:
         """
         List all users with optional role filter.
         """
@@ -27,10 +35,7 @@ class AdminService:
                 continue
 
             # Count user's documents
-            doc_count = len([
-                d for d in _documents.values()
-                if d["user_id"] == user["id"]
-            ])
+            doc_count = len(user_documents(user["id"]))
 
             users.append({
                 "id": user["id"],
@@ -44,16 +49,13 @@ class AdminService:
         users.sort(key=lambda x: x["created_at"], reverse=True)
         return users
 
-    async def get_user(self, user_id: str) -> Optional[dict]:
+    def get_user(self, user_id: str) -> Optional[dict]:
         """Get a specific user by ID."""
         user = _users.get(user_id)
         if not user:
             return None
 
-        doc_count = len([
-            d for d in _documents.values()
-            if d["user_id"] == user_id
-        ])
+        doc_count = len(user_documents(user_id))
 
         return {
             "id": user["id"],
@@ -64,18 +66,15 @@ class AdminService:
             "document_count": doc_count
         }
 
-    async def update_role(self, user_id: str, new_role: str) -> dict:
+    def update_role(self, user_id: str, new_role: str) -> dict:
         """Update a user's role."""
         user = _users.get(user_id)
         if not user:
             raise Exception("User not found")
 
-        user["role"] = new_role
+        user["role"] = sys.intern(new_role)
 
-        doc_count = len([
-            d for d in _documents.values()
-            if d["user_id"] == user_id
-        ])
+        doc_count = len(user_documents(user_id))
 
         return {
             "id": user["id"],
@@ -86,24 +85,21 @@ class AdminService:
             "document_count": doc_count
         }
 
-    async def delete_user(self, user_id: str) -> bool:
+    def delete_user(self, user_id: str) -> bool:
         """Delete a user and their documents."""
         if user_id not in _users:
             return False
 
         # Delete user's documents
-        docs_to_delete = [
-            d["id"] for d in _documents.values()
-            if d["user_id"] == user_id
-        ]
-        for doc_id in docs_to_delete:
-            del _documents[doc_id]
+        for doc_id in list(user_documents(user_id)):
+            remove_document(doc_id)
 
         # Delete user
-        del _users[user_id]
+        user = _users.pop(user_id)
+        _users_by_email.pop(user["email"], None)
         return True
 
-    async def get_audit_logs(
+    def get_audit_logs(
         self,
         user_id: Optional[str] = None,
         action: Optional[str] = None,
@@ -111,67 +107,58 @@ class AdminService:
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
         page: int = 1,
-        page_size: int = 50
-    ) -> Tuple[List[dict], int]:
-        """Get audit logs with filtering."""
-        logs = _audit_logs.copy()
-
-        # Apply filters
-        if user_id:
-            logs = [l for l in logs if l["user_id"] == user_id]
-        if action:
-            logs = [l for l in logs if l["action"] == action]
-        if resource_type:
-            logs = [l for l in logs if l["resource_type"] == resource_type]
-        if date_from:
-            logs = [l for l in logs if l["created_at"] >= date_from]
-        if date_to:
-            logs = [l for l in logs if l["created_at"] <= date_to]
-
-        # Add user email to logs
+        page_size: int = 50,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> Tuple[List[dict], Optional[int], Optional[str]]:
+        """Get audit logs with filtering, newest first."""
+        logs, total, next_cursor = audit.get_audit_logs(
+            user_id=user_id,
+            action=action,
+            resource_type=resource_type,
+            date_from=date_from,
+            date_to=date_to,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total
+        )
+
+        # Add user email to logs (without touching the stored entries)
+        results = []
         for log in logs:
             user = _users.get(log["user_id"])
-            log["user_email"] = user["email"] if user else None
+            results.append({**log, "user_email": user["email"] if user else None})
 
-        # Sort and paginate
-        logs.sort(key=lambda x: x["created_at"], reverse=True)
+        return results, total, next_cursor
 
-        total = len(logs)
-        start = (page - 1) * page_size
-        end = start + page_size
+    def get_stats_version(self) -> tuple:
+        """Changes whenever the data behind get_dashboard_stats does."""
+        return store_version(), len(_users)
 
-        return logs[start:end], total
-
-    async def get_dashboard_stats(self) -> dict:
+    def get_dashboard_stats(self) -> dict:
         """Get dashboard statistics."""
-        now = datetime.utcnow()
-        today = now.date().isoformat()
-        week_ago = (now - timedelta(days=7)).isoformat()
+        now = datetime.now(timezone.utc)
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        week_ago = (now - timedelta(days=7)).timestamp()
 
         total_users = len(_users)
         total_documents = len(_documents)
 
-        # Documents today
-        docs_today = len([
-            d for d in _documents.values()
-            if d["created_at"].startswith(today)
-        ])
-
-        # Documents this week
-        docs_this_week = len([
-            d for d in _documents.values()
-            if d["created_at"] >= week_ago
-        ])
-
-        # Classification breakdown
-        classification_breakdown = {}
-        for doc in _documents.values():
-            cls = doc.get("classification") or "unclassified"
-            classification_breakdown[cls] = classification_breakdown.get(cls, 0) + 1
-
-        # Storage used (approximate)
-        storage_bytes = sum(d.get("file_size", 0) for d in _documents.values())
-        storage_mb = storage_bytes / (1024 * 1024)
+        # Documents are stored in creation order, so count back from the
+        # newest until we pass the start of the week
+        docs_today = 0
+        docs_this_week = 0
+        for d in reversed(_documents.values()):
+            if d["created_at_ts"] < week_ago:
+                break
+            docs_this_week += 1
+            if d["created_at_ts"] >= today_start:
+                docs_today += 1
+
+        # Maintained by the document service
+        classification_breakdown = classification_counts()
+        storage_mb = total_storage_bytes() / (1024 * 1024)
 
         return {
             "total_users": total_users,
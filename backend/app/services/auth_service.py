@@ -5,16 +5,28 @@ Handles user registration and login via Supabase Auth.
 
 from typing import Optional
 from datetime import datetime
+import asyncio
 import uuid
-from passlib.context import CryptContext
+import bcrypt
 
 from app.config import settings
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing (bcrypt called directly, without passlib's scheme dispatch)
+BCRYPT_ROUNDS = 12
+
+
+def hash_password(password: str) -> str:
+    """Hash a password with a fresh bcrypt salt."""
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """Check a password against a stored bcrypt hash."""
+    return bcrypt.checkpw(password.encode(), password_hash.encode())
 
 # In-memory user store for development (replace with Supabase in production)
 _users = {}
+_users_by_email = {}  # email -> user_id
 
 
 class AuthService:
@@ -48,13 +60,13 @@ class AuthService:
             Exception if email already exists
         """
         # Check if email exists
-        for user in _users.values():
-            if user["email"] == email:
-                raise Exception("Email already registered")
+        if email in _users_by_email:
+            raise Exception("Email already registered")
 
         # Create user
         user_id = str(uuid.uuid4())
-        hashed_password = pwd_context.hash(password)
+        # bcrypt is deliberately slow; keep it off the event loop
+        hashed_password = await asyncio.to_thread(hash_password, password)
 
         user = {
             "id": user_id,
@@ -65,7 +77,12 @@ class AuthService:
             "created_at": datetime.utcnow().isoformat()
         }
 
+        # Re-check: a concurrent registration may have won while hashing
+        if email in _users_by_email:
+            raise Exception("Email already registered")
+
         _users[user_id] = user
+        _users_by_email[email] = user_id
 
         # Return user without password
         return {
@@ -91,17 +108,14 @@ class AuthService:
             Exception if credentials invalid
         """
         # Find user by email
-        user = None
-        for u in _users.values():
-            if u["email"] == email:
-                user = u
-                break
+        user_id = _users_by_email.get(email)
+        user = _users.get(user_id) if user_id else None
 
         if not user:
             raise Exception("Invalid credentials")
 
         # Verify password
-        if not pwd_context.verify(password, user["password_hash"]):
+        if not await asyncio.to_thread(verify_password, password, user["password_hash"]):
             raise Exception("Invalid credentials")
 
         # Return user without password
@@ -113,7 +127,7 @@ class AuthService:
             "created_at": user["created_at"]
         }
 
-    async def get_user(self, user_id: str) -> Optional[dict]:
+    def get_user(self, user_id: str) -> Optional[dict]:
         """
         Get a user by ID.
         """
@@ -142,8 +156,8 @@ class AuthService:
         if not user:
             raise Exception("User not found")
 
-        if not pwd_context.verify(current_password, user["password_hash"]):
+        if not await asyncio.to_thread(verify_password, current_password, user["password_hash"]):
             raise Exception("Current password incorrect")
 
-        user["password_hash"] = pwd_context.hash(new_password)
+        user["password_hash"] = await asyncio.to_thread(hash_password, new_password)
         return True
@@ -9,17 +9,43 @@ from datetime import datetime
 # In-memory storage for demo documents
 _demo_documents: List[Dict[str, Any]] = []
 
+# Lowercased searchable fields of each document, parallel to _demo_documents
+_search_blobs: List[str] = []
+
+# Newest-first view of _demo_documents, rebuilt after the store changes
+_newest_first: Optional[List[Dict[str, Any]]] = None
+
+
+def _search_blob(doc: Dict[str, Any]) -> str:
+    """
+    Text, filename, classification and entity values, lowercased once.
+    NUL-separated so a query can't match across two fields.
+    """
+    entities_text = " ".join(e.get("value", "") for e in doc.get("entities", []))
+    return "\0".join((
+        doc.get("extracted_text") or "",
+        doc.get("filename") or "",
+        doc.get("classification") or "",
+        entities_text
+    )).lower()
+
 
 def add_document(doc: Dict[str, Any]) -> Dict[str, Any]:
     """Add a processed document to the store."""
+    global _newest_first
     doc["created_at"] = datetime.now().isoformat()
     _demo_documents.append(doc)
+    _search_blobs.append(_search_blob(doc))
+    _newest_first = None
     return doc
 
 
 def get_all_documents() -> List[Dict[str, Any]]:
-    """Get all stored documents."""
-    return list(reversed(_demo_documents))  # Newest first
+    """Get all stored documents, newest first. Treat the list as read-only."""
+    global _newest_first
+    if _newest_first is None:
+        _newest_first = list(reversed(_demo_documents))
+    return _newest_first
 
 
 def get_document_by_id(doc_id: str) -> Optional[Dict[str, Any]]:
@@ -39,26 +65,12 @@ def search_documents(query: str) -> List[Dict[str, Any]]:
         return get_all_documents()
 
     query_lower = query.lower()
-    results = []
-
-    for doc in _demo_documents:
-        # Search in extracted text
-        text = doc.get("extracted_text", "").lower()
-        filename = doc.get("filename", "").lower()
-        classification = doc.get("classification", "").lower()
-
-        # Check entities too
-        entities_text = " ".join(
-            e.get("value", "") for e in doc.get("entities", [])
-        ).lower()
-
-        if (query_lower in text or
-            query_lower in filename or
-            query_lower in classification or
-            query_lower in entities_text):
-            results.append(doc)
 
-    return list(reversed(results))  # Newest first
+    # Newest first
+    return [
+        doc for doc, blob in zip(reversed(_demo_documents), reversed(_search_blobs))
+        if query_lower in blob
+    ]
 
 
 def get_stats() -> Dict[str, Any]:
@@ -80,4 +92,7 @@ def get_stats() -> Dict[str, Any]:
 
 def clear_store() -> None:
     """Clear all documents (useful for testing)."""
+    global _newest_first
     _demo_documents.clear()
+    _search_blobs.clear()
+    _newest_first = None
@@ -4,31 +4,140 @@ Handles document CRUD operations and metadata management.
 """
 
 from typing import Optional, List, Tuple
+from bisect import bisect_left
+from collections import Counter
 from datetime import datetime
+from itertools import count, islice
+from operator import itemgetter
+import sys
 import uuid
 
-# In-memory document store (replace with Supabase in production)
+from app.services import text_index
+from app.services.pagination import encode_position, decode_position, take_window
+from app.services.timestamps import utc_now
+
+# In-memory document store (replace with Supabase in production).
+# The stores and indexes below are only touched from the event loop thread
+# (ML and OCR worker threads never see them) and every service method is
+# synchronous, so each update is atomic without locking.
 _documents = {}
 _entities = {}
 
+# (user_id, sha256 hex) -> document ID, for upload deduplication
+_documents_by_hash = {}
+
+# user_id -> {document ID: document}, in creation order
+_documents_by_user = {}
+
+# user_id -> the user's documents in creation order, for cursor seeks.
+# Each document's "position" comes from one store-wide counter, so every
+# list is sorted by it.
+_positions = count()
+_position = itemgetter("position")
+_timelines = {}
+
+# Per-user counter bumped on every change to that user's documents, plus
+# one for the whole store
+_user_versions = {}
+_store_version = 0
+
+# Store-wide aggregates kept current on create/update/delete
+_classification_counts = Counter()  # classification (or "unclassified") -> documents
+_total_storage_bytes = 0
+
+
+def touch_user(user_id: str) -> None:
+    """Mark a user's document collection as changed."""
+    global _store_version
+    _user_versions[user_id] = _user_versions.get(user_id, 0) + 1
+    _store_version += 1
+
+
+def store_version() -> int:
+    """Counter that changes whenever any document does."""
+    return _store_version
+
+
+def user_documents(user_id: str) -> dict:
+    """A user's documents keyed by ID, oldest first. Treat as read-only."""
+    return _documents_by_user.get(user_id, {})
+
+
+def _count_classification(classification: Optional[str], delta: int) -> None:
+    key = classification or "unclassified"
+    _classification_counts[key] += delta
+    if _classification_counts[key] <= 0:
+        del _classification_counts[key]
+
+
+def classification_counts() -> dict:
+    """Documents per classification across all users."""
+    return dict(_classification_counts)
+
+
+def total_storage_bytes() -> int:
+    """Sum of file sizes across all documents."""
+    return _total_storage_bytes
+
+
+def remove_document(document_id: str) -> Optional[dict]:
+    """
+    Drop a document record and every index entry pointing at it.
+
+    Returns:
+        The removed document, or None if it didn't exist
+    """
+    global _total_storage_bytes
+
+    doc = _documents.pop(document_id, None)
+    if not doc:
+        return None
+
+    _count_classification(doc["classification"], -1)
+    _total_storage_bytes -= doc["file_size"]
+
+    user_id = doc["user_id"]
+    _entities.pop(document_id, None)
+    text_index.remove(document_id)
+    _documents_by_hash.pop((user_id, doc["content_hash"]), None)
+
+    user_docs = _documents_by_user.get(user_id)
+    if user_docs is not None:
+        user_docs.pop(document_id, None)
+        if not user_docs:
+            del _documents_by_user[user_id]
+
+    timeline = _timelines.get(user_id)
+    if timeline is not None:
+        i = bisect_left(timeline, doc["position"], key=_position)
+        if i < len(timeline) and timeline[i] is doc:
+            del timeline[i]
+        if not timeline:
+            del _timelines[user_id]
+
+    touch_user(user_id)
+    return doc
+
 
 class DocumentService:
     """
     Service for document management operations.
     """
 
-    async def create(
+    def create(
         self,
         user_id: str,
         filename: str,
         file_path: str,
         file_size: int,
-        mime_type: str
+        mime_type: str,
+        content_hash: Optional[str] = None
     ) -> dict:
         """
         Create a new document record.
         """
         doc_id = str(uuid.uuid4())
+        created_at, created_at_ts = utc_now()
 
         document = {
             "id": doc_id,
@@ -37,21 +146,33 @@ class DocumentService:
             "file_path": file_path,
             "file_size": file_size,
             "mime_type": mime_type,
+            "content_hash": content_hash,
             "classification": None,
             "confidence_score": None,
             "extracted_text": None,
             "tags": [],
             "status": "processing",
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            "created_at": created_at,
+            "created_at_ts": created_at_ts,
+            "updated_at": created_at,
+            "position": next(_positions)
         }
 
+        global _total_storage_bytes
+
         _documents[doc_id] = document
         _entities[doc_id] = []
+        _count_classification(None, 1)
+        _total_storage_bytes += file_size
+        _documents_by_user.setdefault(user_id, {})[doc_id] = document
+        _timelines.setdefault(user_id, []).append(document)
+        if content_hash:
+            _documents_by_hash[(user_id, content_hash)] = doc_id
+        touch_user(user_id)
 
-        return document
+        return {**document, "entities": _entities[doc_id]}
 
-    async def get(self, document_id: str, user_id: str) -> Optional[dict]:
+    def get(self, document_id: str, user_id: str) -> Optional[dict]:
         """
         Get a document by ID (only if owned by user).
         """
@@ -63,45 +184,85 @@ class DocumentService:
         doc["entities"] = _entities.get(document_id, [])
         return doc
 
-    async def list(
+    def get_by_hash(self, user_id: str, content_hash: str) -> Optional[dict]:
+        """
+        Get the user's document with the given SHA-256 content hash, if any.
+        """
+        doc_id = _documents_by_hash.get((user_id, content_hash))
+        if not doc_id:
+            return None
+
+        return self.get(doc_id, user_id)
+
+    def get_version(self, user_id: str) -> int:
+        """
+        Get a counter that changes whenever the user's documents do.
+        Cheap enough to check before building a list response.
+        """
+        return _user_versions.get(user_id, 0)
+
+    def list(
         self,
         user_id: str,
         page: int = 1,
         page_size: int = 20,
         classification: Optional[str] = None,
-        status: Optional[str] = None
-    ) -> Tuple[List[dict], int]:
+        status: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> Tuple[List[dict], Optional[int], Optional[str]]:
         """
-        List documents for a user with optional filtering.
+        List documents for a user with optional filtering, newest first.
+
+        Pass the previous page's next_cursor as `cursor` for keyset
+        pagination; otherwise `page` is used as an offset. The total count
+        is only computed when include_total is set.
+
+        Returns:
+            Tuple of (documents, total or None, next_cursor or None)
+
+        Raises:
+            ValueError if the cursor is malformed
         """
-        # Filter documents
-        user_docs = [
-            d for d in _documents.values()
-            if d["user_id"] == user_id
-        ]
+        timeline = _timelines.get(user_id, [])
+
+        # A cursor holds the position of the previous page's last row, so
+        # the walk starts just below it instead of re-testing newer rows
+        end = len(timeline)
+        if cursor:
+            end = bisect_left(timeline, decode_position(cursor), key=_position)
 
-        if classification:
-            user_docs = [d for d in user_docs if d["classification"] == classification]
+        def matches(d):
+            return (
+                (not classification or d["classification"] == classification)
+                and (not status or d["status"] == status)
+            )
 
-        if status:
-            user_docs = [d for d in user_docs if d["status"] == status]
+        # The timeline is in creation order, so walking backwards yields
+        # newest first without sorting
+        matching = filter(matches, (timeline[i] for i in range(end - 1, -1, -1)))
 
-        # Sort by date descending
-        user_docs.sort(key=lambda x: x["created_at"], reverse=True)
+        # Paginate (fetch one extra row to know if there is a next page)
+        start = 0 if cursor else max(page - 1, 0) * page_size
+        window, total = take_window(matching, start, page_size + 1, count=include_total)
+        paginated = window[:page_size]
 
-        # Paginate
-        total = len(user_docs)
-        start = (page - 1) * page_size
-        end = start + page_size
-        paginated = user_docs[start:end]
+        # The total covers the whole filtered set, including rows newer
+        # than the cursor
+        if total is not None and cursor:
+            total += sum(1 for _ in filter(matches, islice(timeline, end, None)))
+
+        next_cursor = None
+        if len(window) > page_size:
+            next_cursor = encode_position(paginated[-1]["position"])
 
         # Add entities to each document
         for doc in paginated:
             doc["entities"] = _entities.get(doc["id"], [])
 
-        return paginated, total
+        return paginated, total, next_cursor
 
-    async def update(
+    def update(
         self,
         document_id: str,
         classification: Optional[str] = None,
@@ -118,7 +279,12 @@ class DocumentService:
         if not doc:
             raise Exception("Document not found")
 
+        # Classification and status take a handful of values; intern them
+        # so documents share one string object per value
         if classification is not None:
+            classification = sys.intern(classification)
+            _count_classification(doc["classification"], -1)
+            _count_classification(classification, 1)
             doc["classification"] = classification
 
         if confidence_score is not None:
@@ -126,43 +292,63 @@ class DocumentService:
 
         if extracted_text is not None:
             doc["extracted_text"] = extracted_text
+            text_index.index_text(document_id, extracted_text)
 
         if tags is not None:
             doc["tags"] = tags
 
         if status is not None:
-            doc["status"] = status
+            doc["status"] = sys.intern(status)
 
         if entities is not None:
             _entities[document_id] = entities
+            text_index.index_entities(document_id, entities)
 
         doc["updated_at"] = datetime.utcnow().isoformat()
+        touch_user(doc["user_id"])
         doc["entities"] = _entities.get(document_id, [])
 
         return doc
 
-    async def delete(self, document_id: str) -> bool:
+    def update_if_owner(self, document_id: str, user_id: str, **fields) -> Optional[dict]:
+        """
+        Update a document only if it is owned by the user.
+        Accepts the same fields as update().
+
+        Returns:
+            Updated document, or None if not found / not owned
+        """
+        doc = _documents.get(document_id)
+        if not doc or doc["user_id"] != user_id:
+            return None
+
+        return self.update(document_id, **fields)
+
+    def delete_if_owner(self, document_id: str, user_id: str) -> Optional[dict]:
+        """
+        Delete a document record only if it is owned by the user.
+
+        Returns:
+            Deleted document, or None if not found / not owned
+        """
+        doc = _documents.get(document_id)
+        if not doc or doc["user_id"] != user_id:
+            return None
+
+        return remove_document(document_id)
+
+    def delete(self, document_id: str) -> bool:
         """
         Delete a document record.
         """
-        if document_id in _documents:
-            del _documents[document_id]
-            if document_id in _entities:
-                del _entities[document_id]
-            return True
-        return False
+        return remove_document(document_id) is not None
 
-    async def get_classification_stats(self, user_id: str) -> dict:
+    def get_classification_stats(self, user_id: str) -> dict:
         """
         Get document classification statistics for a user.
         """
-        user_docs = [
-            d for d in _documents.values()
-            if d["user_id"] == user_id
-        ]
-
         stats = {}
-        for doc in user_docs:
+        for doc in user_documents(user_id).values():
             classification = doc.get("classification") or "unclassified"
             stats[classification] = stats.get(classification, 0) + 1
 
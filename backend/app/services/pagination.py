@@ -0,0 +1,60 @@
+"""
+Pagination helpers.
+Opaque keyset cursors and windowing for list endpoints.
+"""
+
+from typing import Iterable, List, Optional, Tuple
+from itertools import islice
+import base64
+
+
+def encode_position(position: int) -> str:
+    """
+    Build a cursor pointing just past the row at the given position.
+
+    Args:
+        position: Store position of the last row on the page
+
+    Returns:
+        URL-safe cursor string
+    """
+    return base64.urlsafe_b64encode(str(position).encode()).decode()
+
+
+def decode_position(cursor: str) -> int:
+    """
+    Decode a cursor into its store position.
+
+    Raises:
+        ValueError if the cursor is malformed
+    """
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def take_window(
+    items: Iterable,
+    start: int,
+    size: int,
+    count: bool = False
+) -> Tuple[List, Optional[int]]:
+    """
+    Take items[start:start + size] from an iterable.
+
+    With count set, the rest of the iterable is consumed to count every
+    item, without holding more than the window in memory.
+
+    Returns:
+        Tuple of (window, total count or None)
+    """
+    it = iter(items)
+    skipped = sum(1 for _ in islice(it, start))
+    window = list(islice(it, size))
+
+    total = None
+    if count:
+        total = skipped + len(window) + sum(1 for _ in it)
+
+    return window, total
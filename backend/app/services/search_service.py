@@ -4,7 +4,44 @@ Full-text search across documents.
 """
 
 from typing import Optional, List, Tuple
-from app.services.document_service import _documents, _entities
+from bisect import bisect_left
+import heapq
+import re
+
+from app.services import text_index
+from app.services.timestamps import parse_timestamp
+from app.services.document_service import _entities, _user_versions, user_documents
+
+# Per-user suggestion index: user_id -> (collection version, sorted (key, term) pairs)
+_suggest_index = {}
+
+# Per-user filter options: user_id -> (collection version, options)
+_filter_options = {}
+
+# Suggestions also match from the start of each word inside a term
+_WORD_BREAK = re.compile(r"[\s._\-/]+")
+
+
+def _build_suggest_index(user_id: str) -> List[Tuple[str, str]]:
+    """
+    Build the sorted prefix index over a user's filenames, tags and entity values.
+    """
+    terms = set()
+    for doc in user_documents(user_id).values():
+        terms.add(doc["filename"])
+        terms.update(doc["tags"])
+        terms.update(entity["value"] for entity in _entities.get(doc["id"], []))
+
+    keys = []
+    for term in terms:
+        lower = term.lower()
+        keys.append((lower, term))
+        for match in _WORD_BREAK.finditer(lower):
+            if match.end() < len(lower):
+                keys.append((lower[match.end():], term))
+
+    keys.sort()
+    return keys
 
 
 class SearchService:
@@ -12,7 +49,7 @@ class SearchService:
     Service for document search operations.
     """
 
-    async def search(
+    def search(
         self,
         user_id: str,
         query: str,
@@ -28,23 +65,34 @@ class SearchService:
         Search documents with full-text and filters.
 
         In production, this would use PostgreSQL full-text search.
+
+        Raises:
+            ValueError if date_from or date_to isn't an ISO date
         """
+        ts_from = parse_timestamp(date_from)
+        ts_to = parse_timestamp(date_to)
         query_lower = query.lower()
-        results = []
+        entity_value_lower = entity_type and entity_value and entity_value.lower()
 
-        for doc_id, doc in _documents.items():
-            # Only search user's documents
-            if doc["user_id"] != user_id:
-                continue
+        # Only the best page * page_size matches are kept, in a min-heap of
+        # (score, -match number, doc_id, snippet); earlier matches win ties
+        keep = max(page, 0) * page_size
+        top = []
+        total = 0
+
+        # Documents whose text can contain the query (None: check them all)
+        text_candidates = text_index.text_candidates(query_lower)
 
+        # Only search user's documents
+        for doc_id, doc in user_documents(user_id).items():
             # Apply filters
             if classification and doc.get("classification") != classification:
                 continue
 
-            if date_from and doc["created_at"] < date_from:
+            if ts_from is not None and doc["created_at_ts"] < ts_from:
                 continue
 
-            if date_to and doc["created_at"] > date_to:
+            if ts_to is not None and doc["created_at_ts"] > ts_to:
                 continue
 
             # Calculate relevance score
@@ -56,57 +104,67 @@ class SearchService:
                 score += 2.0
                 snippet = doc["filename"]
 
-            # Search in extracted text
-            text = doc.get("extracted_text") or ""
-            if query_lower in text.lower():
+            # Search in extracted text (lowered at index time)
+            idx = -1
+            if text_candidates is None or doc_id in text_candidates:
+                idx = text_index.text_lower(doc_id).find(query_lower)
+            if idx >= 0:
+                text = doc.get("extracted_text") or ""
                 score += 1.0
                 # Extract snippet around the match
-                idx = text.lower().find(query_lower)
                 start = max(0, idx - 50)
                 end = min(len(text), idx + len(query) + 50)
                 snippet = "..." + text[start:end] + "..."
 
             # Search in entities
             doc_entities = _entities.get(doc_id, [])
-            for entity in doc_entities:
-                if query_lower in entity["value"].lower():
+            for entity, value_lower in zip(doc_entities, text_index.entity_values_lower(doc_id)):
+                if query_lower in value_lower:
                     score += 1.5
 
                 # Filter by entity type/value
-                if entity_type and entity["type"] == entity_type:
-                    if entity_value and entity_value.lower() in entity["value"].lower():
+                if entity_value_lower and entity["type"] == entity_type:
+                    if entity_value_lower in value_lower:
                         score += 0.5
 
             # Add to results if matched
             if score > 0:
-                results.append({
-                    "id": doc_id,
-                    "filename": doc["filename"],
-                    "classification": doc.get("classification"),
-                    "snippet": snippet or doc["filename"],
-                    "score": score,
-                    "created_at": doc["created_at"]
-                })
-
-        # Sort by score descending
-        results.sort(key=lambda x: x["score"], reverse=True)
-
-        # Paginate
-        total = len(results)
-        start = (page - 1) * page_size
-        end = start + page_size
-        paginated = results[start:end]
+                total += 1
+                entry = (score, -total, doc_id, snippet or doc["filename"])
+                if len(top) < keep:
+                    heapq.heappush(top, entry)
+                elif top and entry > top[0]:
+                    heapq.heapreplace(top, entry)
+
+        # Sort the kept matches by score descending and cut out the page
+        ranked = sorted(top, reverse=True)[max(page - 1, 0) * page_size:]
+
+        docs = user_documents(user_id)
+        paginated = [
+            {
+                "id": doc_id,
+                "filename": docs[doc_id]["filename"],
+                "classification": docs[doc_id].get("classification"),
+                "snippet": snippet,
+                "score": score,
+                "created_at": docs[doc_id]["created_at"]
+            }
+            for score, _, doc_id, snippet in ranked
+        ]
 
         return paginated, total
 
-    async def get_filter_options(self, user_id: str) -> dict:
+    def get_filter_options(self, user_id: str) -> dict:
         """
         Get available filter options for the user's documents.
+        Recomputed only after the user's documents change.
         """
-        user_docs = [
-            d for d in _documents.values()
-            if d["user_id"] == user_id
-        ]
+        version = _user_versions.get(user_id, 0)
+        cached = _filter_options.get(user_id)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        user_docs = list(user_documents(user_id).values())
 
         # Get unique classifications
         classifications = list(set(
@@ -127,13 +185,15 @@ class SearchService:
             "max": max(dates) if dates else None
         }
 
-        return {
+        options = {
             "classifications": sorted(classifications),
             "entity_types": sorted(entity_types),
             "date_range": date_range
         }
+        _filter_options[user_id] = (version, options)
+        return options
 
-    async def suggest(
+    def suggest(
         self,
         user_id: str,
         partial_query: str,
@@ -141,24 +201,26 @@ class SearchService:
     ) -> List[str]:
         """
         Get search suggestions based on partial query.
-        """
-        suggestions = set()
-        query_lower = partial_query.lower()
 
-        user_docs = [
-            d for d in _documents.values()
-            if d["user_id"] == user_id
-        ]
+        Matches the start of any word in a filename, tag or entity value.
+        The index is rebuilt lazily after the user's documents change.
+        """
+        version = _user_versions.get(user_id, 0)
+        cached = _suggest_index.get(user_id)
+        if cached and cached[0] == version:
+            keys = cached[1]
+        else:
+            keys = _build_suggest_index(user_id)
+            _suggest_index[user_id] = (version, keys)
 
-        # Suggest from filenames
-        for doc in user_docs:
-            if query_lower in doc["filename"].lower():
-                suggestions.add(doc["filename"])
+        query_lower = partial_query.lower()
 
-        # Suggest from entity values
-        for doc in user_docs:
-            for entity in _entities.get(doc["id"], []):
-                if query_lower in entity["value"].lower():
-                    suggestions.add(entity["value"])
+        # Keys are sorted, so stop as soon as `limit` distinct terms are
+        # found; suggestions come back in matched-key order
+        suggestions = {}
+        i = bisect_left(keys, (query_lower,))
+        while i < len(keys) and len(suggestions) < limit and keys[i][0].startswith(query_lower):
+            suggestions[keys[i][1]] = None
+            i += 1
 
-        return sorted(suggestions)[:limit]
+        return list(suggestions)
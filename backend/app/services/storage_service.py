@@ -3,18 +3,112 @@ Storage Service.
 Handles file storage operations with Supabase Storage.
 """
 
-from typing import Optional
+from typing import List, Optional, AsyncIterable, AsyncIterator, Tuple
+from contextlib import suppress
+from functools import lru_cache
+import asyncio
+import hmac
 import os
+import time
 import aiofiles
+import aiofiles.os
 import logging
+from cachetools import LRUCache
 
 from app.config import settings
 
+try:
+    import caio
+except ImportError:  # Optional: local I/O falls back to worker threads
+    caio = None
+
 logger = logging.getLogger(__name__)
 
 # Local upload directory for development
 UPLOAD_DIR = "uploads"
 
+# Reads/writes that may be in flight at once on the shared caio context
+AIO_MAX_REQUESTS = 512
+
+# Downloads are streamed in chunks of this size
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# Streamed uploads are buffered to about this many bytes per write hop
+WRITE_BATCH_SIZE = 1024 * 1024
+
+# Sizes of recently written or stat'ed local files
+SIZE_CACHE_SIZE = 10000
+
+# Upload directories known to exist
+KNOWN_DIRS_SIZE = 4096
+
+# Signed URL expiries are rounded up to this many seconds, so every URL for
+# a file issued within one bucket is identical (and its signature cached)
+SIGNED_URL_BUCKET = 60
+
+
+@lru_cache(maxsize=10000)
+def _sign(file_path: str, expires: int) -> str:
+    """HMAC-SHA256 (via OpenSSL) of a local download path and its expiry."""
+    message = f"{file_path}:{expires}".encode()
+    return hmac.new(settings.jwt_secret.encode(), message, "sha256").hexdigest()
+
+
+def verify_signature(file_path: str, expires: int, signature: str) -> bool:
+    """Check a local signed download URL's signature and expiry."""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_sign(file_path, expires), signature)
+
+
+def _open_temp(full_path: str, make_dir: bool = True) -> Tuple[int, str]:
+    """
+    Create the directory (if make_dir) and open a temp file next to
+    full_path, where a streamed write goes until _commit_temp.
+
+    Returns:
+        Tuple of (fd, temp path)
+    """
+    if make_dir:
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+    tmp_path = f"{full_path}.tmp"
+    return os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644), tmp_path
+
+
+def _write_chunks(fd: int, chunks: List[bytes]) -> None:
+    for chunk in chunks:
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(fd, view):]
+
+
+def _commit_temp(fd: int, tmp_path: str, full_path: str, chunks: List[bytes] = ()) -> None:
+    """
+    Write any last chunks, fsync and rename the temp file into place, so
+    readers never see a partial file. The temp file is removed on failure.
+    """
+    try:
+        _write_chunks(fd, chunks)
+        os.fsync(fd)
+    except BaseException:
+        _discard_temp(fd, tmp_path)
+        raise
+    os.close(fd)
+
+    os.replace(tmp_path, full_path)
+
+
+def _discard_temp(fd: int, tmp_path: str) -> None:
+    os.close(fd)
+    with suppress(FileNotFoundError):
+        os.remove(tmp_path)
+
+
+def _read_file(full_path: str) -> bytes:
+    with open(full_path, "rb") as f:
+        return f.read()
+
 
 class StorageService:
     """
@@ -30,55 +124,139 @@ class StorageService:
         # In production, initialize Supabase client here
         self.supabase = None
 
-    async def upload(
+        # One submission context shared by all local reads and writes,
+        # created on first use (it binds to the running event loop)
+        self.use_aio = settings.storage_aio and caio is not None
+        self._aio_context = None
+
+        # file_path -> size in bytes. Local files are only written and
+        # deleted through this service, which keeps the cache in step
+        self._size_cache = LRUCache(maxsize=SIZE_CACHE_SIZE)
+
+        # Directories this service has created (or found), so makedirs runs
+        # once per directory. Nothing here ever removes a directory
+        self._known_dirs = LRUCache(maxsize=KNOWN_DIRS_SIZE)
+
+    def _needs_dir(self, full_path: str) -> bool:
+        return os.path.dirname(full_path) not in self._known_dirs
+
+    def _dir_exists(self, full_path: str) -> None:
+        self._known_dirs[os.path.dirname(full_path)] = True
+
+    def _aio(self):
+        if self._aio_context is None:
+            self._aio_context = caio.AsyncioContext(max_requests=AIO_MAX_REQUESTS)
+        return self._aio_context
+
+    async def _write_aio(self, fd: int, chunks: List[bytes], offset: int) -> None:
+        """Write chunks at increasing offsets from `offset` on the shared caio context."""
+        ctx = self._aio()
+        for chunk in chunks:
+            while chunk:
+                done = await ctx.write(chunk, fd, offset)
+                offset += done
+                chunk = chunk[done:]
+
+    async def _write_batch(self, fd: int, chunks: List[bytes], offset: int) -> None:
+        if self.use_aio:
+            await self._write_aio(fd, chunks, offset)
+        else:
+            await asyncio.to_thread(_write_chunks, fd, chunks)
+
+    async def _read_aio(self, full_path: str) -> bytes:
+        fd = os.open(full_path, os.O_RDONLY)
+        try:
+            ctx = self._aio()
+            size = os.fstat(fd).st_size
+            parts = []
+            offset = 0
+            while offset < size:
+                part = await ctx.read(size - offset, fd, offset)
+                if not part:
+                    break
+                parts.append(part)
+                offset += len(part)
+            return b"".join(parts)
+        finally:
+            os.close(fd)
+
+    async def upload_stream(
         self,
         file_path: str,
-        content: bytes,
+        chunks: AsyncIterable[bytes],
         content_type: str
-    ) -> str:
+    ) -> int:
         """
-        Upload a file to storage.
+        Upload a file to storage chunk by chunk, without holding it in memory.
 
         Args:
             file_path: Path to store the file (e.g., "user_id/file_id.pdf")
-            content: File bytes
+            chunks: Async iterable of file bytes
             content_type: MIME type
 
         Returns:
-            Storage path
+            Number of bytes written
         """
         if self.supabase:
-            # Production: Upload to Supabase Storage
-            return await self._upload_supabase(file_path, content, content_type)
+            return await self._upload_stream_supabase(file_path, chunks, content_type)
         else:
-            # Development: Save to local filesystem
-            return await self._upload_local(file_path, content)
+            return await self._upload_stream_local(file_path, chunks)
 
-    async def _upload_local(self, file_path: str, content: bytes) -> str:
-        """Save file to local filesystem."""
+    async def _upload_stream_local(
+        self,
+        file_path: str,
+        chunks: AsyncIterable[bytes]
+    ) -> int:
+        """
+        Stream file to local filesystem via a temp file that is renamed into
+        place once complete, so a failed or oversized upload never leaves a
+        partial file behind. Chunks are written about WRITE_BATCH_SIZE at a
+        time: one thread hop per batch, or through caio when storage_aio is
+        set. Opening and the final fsync/rename are one thread hop each.
+        """
         full_path = os.path.join(UPLOAD_DIR, file_path)
 
-        # Create directory if needed
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        fd, tmp_path = await asyncio.to_thread(_open_temp, full_path, self._needs_dir(full_path))
+        self._dir_exists(full_path)
 
-        async with aiofiles.open(full_path, "wb") as f:
-            await f.write(content)
+        written = 0
+        pending = []
+        pending_size = 0
+        try:
+            async for chunk in chunks:
+                pending.append(chunk)
+                pending_size += len(chunk)
+                if pending_size >= WRITE_BATCH_SIZE:
+                    await self._write_batch(fd, pending, written)
+                    written += pending_size
+                    pending = []
+                    pending_size = 0
+
+            # caio writes the last batch itself; the thread path folds it
+            # into the commit hop
+            if self.use_aio and pending:
+                await self._write_aio(fd, pending, written)
+                written += pending_size
+                pending = []
+                pending_size = 0
+        except BaseException:
+            await asyncio.to_thread(_discard_temp, fd, tmp_path)
+            raise
 
+        await asyncio.to_thread(_commit_temp, fd, tmp_path, full_path, pending)
+        written += pending_size
+
+        self._size_cache[file_path] = written
         logger.info(f"File saved locally: {full_path}")
-        return file_path
+        return written
 
-    async def _upload_supabase(
+    async def _upload_stream_supabase(
         self,
         file_path: str,
-        content: bytes,
+        chunks: AsyncIterable[bytes],
         content_type: str
-    ) -> str:
-        """Upload file to Supabase Storage."""
-        # This would use the Supabase client in production
-        # Example:
-        # response = self.supabase.storage.from_("documents").upload(
-        #     file_path, content, {"content-type": content_type}
-        # )
+    ) -> int:
+        """Upload file to Supabase Storage using a resumable (multipart) upload."""
         raise NotImplementedError("Supabase storage not configured")
 
     async def download(self, file_path: str) -> bytes:
@@ -94,13 +272,42 @@ class StorageService:
         """Read file from local filesystem."""
         full_path = os.path.join(UPLOAD_DIR, file_path)
 
-        async with aiofiles.open(full_path, "rb") as f:
-            return await f.read()
+        if self.use_aio:
+            return await self._read_aio(full_path)
+        return await asyncio.to_thread(_read_file, full_path)
 
     async def _download_supabase(self, file_path: str) -> bytes:
         """Download file from Supabase Storage."""
         raise NotImplementedError("Supabase storage not configured")
 
+    async def stream(
+        self,
+        file_path: str,
+        chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield a stored file chunk by chunk, without reading it all into memory.
+        """
+        if self.supabase:
+            # Production: ranged GETs against Supabase Storage
+            raise NotImplementedError("Supabase storage not configured")
+
+        full_path = os.path.join(UPLOAD_DIR, file_path)
+        fd = os.open(full_path, os.O_RDONLY)
+        try:
+            offset = 0
+            while True:
+                if self.use_aio:
+                    chunk = await self._aio().read(chunk_size, fd, offset)
+                else:
+                    chunk = await asyncio.to_thread(os.pread, fd, chunk_size, offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                yield chunk
+        finally:
+            os.close(fd)
+
     async def delete(self, file_path: str) -> bool:
         """
         Delete a file from storage.
@@ -113,9 +320,10 @@ class StorageService:
     async def _delete_local(self, file_path: str) -> bool:
         """Delete file from local filesystem."""
         full_path = os.path.join(UPLOAD_DIR, file_path)
+        self._size_cache.pop(file_path, None)
 
         try:
-            os.remove(full_path)
+            await aiofiles.os.remove(full_path)
             logger.info(f"File deleted: {full_path}")
             return True
         except FileNotFoundError:
@@ -149,10 +357,16 @@ class StorageService:
             # return response["signedURL"]
             raise NotImplementedError("Supabase storage not configured")
         else:
-            # Development: Return local path (not a real URL)
-            return f"/api/documents/download/{file_path}"
+            # Development: local download route, signed with the app secret
+            expires = -(-(int(time.time()) + expires_in) // SIGNED_URL_BUCKET) * SIGNED_URL_BUCKET
+            signature = _sign(file_path, expires)
+            return f"/api/documents/download/{file_path}?expires={expires}&signature={signature}"
 
     async def get_file_size(self, file_path: str) -> int:
-        """Get the size of a stored file."""
-        full_path = os.path.join(UPLOAD_DIR, file_path)
-        return os.path.getsize(full_path)
+        """Get the size of a stored file (stat'ed only on a cache miss)."""
+        size = self._size_cache.get(file_path)
+        if size is None:
+            full_path = os.path.join(UPLOAD_DIR, file_path)
+            size = await aiofiles.os.path.getsize(full_path)
+            self._size_cache[file_path] = size
+        return size
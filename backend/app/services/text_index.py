@@ -0,0 +1,78 @@
+"""
+Text Index.
+Lowercased copies and a trigram index of document text for search.
+"""
+
+from typing import Dict, List, Optional, Set
+
+# Document ID -> lowercased extracted text / entity values
+_text_lower: Dict[str, str] = {}
+_entity_values_lower: Dict[str, List[str]] = {}
+
+# Trigram -> IDs of documents whose lowercased text contains it
+_trigram_index: Dict[str, Set[str]] = {}
+_doc_trigrams: Dict[str, Set[str]] = {}
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def index_text(document_id: str, text: str) -> None:
+    """Store the lowercased text of a document and index its trigrams."""
+    _unindex_text(document_id)
+
+    lower = text.lower()
+    _text_lower[document_id] = lower
+
+    trigrams = _trigrams(lower)
+    _doc_trigrams[document_id] = trigrams
+    for trigram in trigrams:
+        _trigram_index.setdefault(trigram, set()).add(document_id)
+
+
+def index_entities(document_id: str, entities: List[dict]) -> None:
+    """Store the lowercased entity values of a document."""
+    _entity_values_lower[document_id] = [e["value"].lower() for e in entities]
+
+
+def remove(document_id: str) -> None:
+    """Forget everything indexed for a document."""
+    _unindex_text(document_id)
+    _entity_values_lower.pop(document_id, None)
+
+
+def _unindex_text(document_id: str) -> None:
+    _text_lower.pop(document_id, None)
+
+    for trigram in _doc_trigrams.pop(document_id, ()):
+        ids = _trigram_index[trigram]
+        ids.discard(document_id)
+        if not ids:
+            del _trigram_index[trigram]
+
+
+def text_lower(document_id: str) -> str:
+    """Lowercased extracted text of a document ("" if none)."""
+    return _text_lower.get(document_id, "")
+
+
+def entity_values_lower(document_id: str) -> List[str]:
+    """Lowercased entity values of a document, in entity order."""
+    return _entity_values_lower.get(document_id, [])
+
+
+def text_candidates(query_lower: str) -> Optional[Set[str]]:
+    """
+    IDs of documents whose text may contain the (lowercased) query.
+
+    Every trigram of the query must occur in a matching text, so only
+    documents in all of their sets can match. Returns None for queries
+    shorter than three characters, which the index can't narrow.
+    """
+    trigrams = _trigrams(query_lower)
+    if not trigrams:
+        return None
+
+    sets = sorted((_trigram_index.get(t, set()) for t in trigrams), key=len)
+    return set.intersection(*sets)
@@ -0,0 +1,33 @@
+"""
+Timestamp helpers.
+Records keep an ISO string for output plus a UTC epoch float for comparisons.
+"""
+
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+
+def utc_now() -> Tuple[str, float]:
+    """Current UTC time as (naive ISO string, epoch seconds)."""
+    now = datetime.utcnow()
+    return now.isoformat(), now.replace(tzinfo=timezone.utc).timestamp()
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """
+    Parse an ISO date/datetime into epoch seconds (naive values are UTC).
+
+    Raises:
+        ValueError if the value isn't ISO 8601
+    """
+    if not value:
+        return None
+
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}")
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
@@ -3,16 +3,264 @@ Workflow Service.
 Manages workflow rules and executes automation actions.
 """
 
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Callable, Dict, Set, Tuple
 from datetime import datetime
+from functools import partial
+from itertools import count
+from operator import contains, eq, itemgetter, ne
 import uuid
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
 # In-memory workflow store
 _workflows = {}
 
+# Workflow ID -> creation sequence number. Evaluation runs candidates in
+# this order (an int sort, with no ties unlike created_at strings)
+_creation_order: Dict[str, int] = {}
+_next_order = count()
+
+# Dispatch index for evaluate(), holding active workflows only. Each one
+# with an "equals"/"in" condition on a hashable value is filed under that
+# condition only: field -> value -> workflow IDs. Everything else must
+# always be checked.
+_easy_index: Dict[str, Dict[Any, Set[str]]] = {}
+_hard_workflows: Set[str] = set()
+
+# Keyed by workflow ID: the index entries it was filed under, and its
+# conditions compiled into a single predicate over an evaluation context
+# (see _context)
+EntityValues = Dict[str, List[str]]
+Context = tuple
+Getter = Callable[[Context], Any]
+Predicate = Callable[[Context], bool]
+
+_indexed_keys: Dict[str, List[Tuple[str, Any]]] = {}
+_predicates: Dict[str, Predicate] = {}
+
+
+def _is_hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _anchor_keys(conditions: List[dict]) -> Optional[List[Tuple[str, Any]]]:
+    """
+    Pick the first indexable condition and return the (field, value) keys
+    a document must hit for the workflow to possibly match.
+    Returns None when no condition can be looked up by hash.
+    """
+    for condition in conditions:
+        field = condition["field"]
+        operator = condition["operator"]
+        value = condition["value"]
+
+        if field.startswith("entity_"):
+            continue  # Document side is a list of values
+
+        if operator == "equals" and _is_hashable(value):
+            return [(field, value)]
+        if operator == "in" and isinstance(value, (list, tuple)) and all(map(_is_hashable, value)):
+            return [(field, v) for v in value]
+
+    return None
+
+
+def _entities_by_type(document: dict) -> EntityValues:
+    """Group a document's entity values by type, in entity order."""
+    by_type: EntityValues = {}
+    for e in document.get("entities", []):
+        by_type.setdefault(e["type"], []).append(e["value"])
+    return by_type
+
+
+# Evaluation context, built once per document per evaluation:
+# (document, entity values by type, lowercased-value cache, *common fields).
+# The common fields are read up front so their getters are plain C-level
+# tuple lookups. Other fields are read from the document when checked,
+# since actions (e.g. tagging) may change them mid-evaluation.
+_CTX_DOCUMENT, _CTX_ENTITIES, _CTX_LOWERED = 0, 1, 2
+_CONTEXT_FIELDS = {"classification": 3, "file_size": 4, "mime_type": 5}
+
+
+def _context(document: dict) -> Context:
+    return (
+        document,
+        _entities_by_type(document),
+        {},
+        document.get("classification"),
+        document.get("file_size", 0),
+        document.get("mime_type"),
+    )
+
+
+def _field_getter(field: str) -> Getter:
+    """Build a function returning the context value a condition field refers to."""
+    if field in _CONTEXT_FIELDS:
+        return itemgetter(_CONTEXT_FIELDS[field])
+
+    if field.startswith("entity_"):
+        entity_type = field.replace("entity_", "").upper()
+        return lambda ctx: ctx[_CTX_ENTITIES].get(entity_type, [])
+
+    return lambda ctx: ctx[_CTX_DOCUMENT].get(field)
+
+
+def _lowered_getter(field: str, get: Getter) -> Getter:
+    """
+    Wrap a getter for "contains": scalar values come back lowercased, and
+    are lowercased once per evaluation however many conditions test them.
+    Lists (tags, entity values) are returned as they are.
+    """
+    def get_lowered(ctx: Context) -> Any:
+        lowered = ctx[_CTX_LOWERED]
+        text = lowered.get(field)
+        if text is not None:
+            return text
+
+        doc_value = get(ctx)
+        if doc_value is None or isinstance(doc_value, list):
+            return doc_value
+
+        text = lowered[field] = str(doc_value).lower()
+        return text
+
+    return get_lowered
+
+
+# Builders for each operator's test of a (non-None) document value against
+# a condition value. Simple operators bind the comparison as a C-level
+# partial so a check is a single call with no Python frame.
+def _test_equals(condition_value: Any) -> Callable[[Any], bool]:
+    return partial(eq, condition_value)
+
+
+def _test_not_equals(condition_value: Any) -> Callable[[Any], bool]:
+    return partial(ne, condition_value)
+
+
+def _test_in(condition_value: Any) -> Callable[[Any], bool]:
+    return partial(contains, condition_value)
+
+
+def _test_contains(condition_value: Any) -> Callable[[Any], bool]:
+    needle = condition_value.lower() if isinstance(condition_value, str) else condition_value
+
+    def test(doc_value: Any) -> bool:
+        if isinstance(doc_value, list):
+            return condition_value in doc_value
+        return needle in doc_value  # Already lowercased by _lowered_getter
+
+    return test
+
+
+def _threshold(condition_value: Any) -> Any:
+    try:
+        return float(condition_value)
+    except (TypeError, ValueError):
+        return condition_value  # Comparing fails at evaluation, as before
+
+
+def _test_greater_than(condition_value: Any) -> Callable[[Any], bool]:
+    threshold = _threshold(condition_value)
+    return lambda doc_value: float(doc_value) > threshold
+
+
+def _test_less_than(condition_value: Any) -> Callable[[Any], bool]:
+    threshold = _threshold(condition_value)
+    return lambda doc_value: float(doc_value) < threshold
+
+
+def _test_never(condition_value: Any) -> Callable[[Any], bool]:
+    return lambda doc_value: False
+
+
+_OPERATOR_TESTS: Dict[str, Callable[[Any], Callable[[Any], bool]]] = {
+    "equals": _test_equals,
+    "not_equals": _test_not_equals,
+    "contains": _test_contains,
+    "greater_than": _test_greater_than,
+    "less_than": _test_less_than,
+    "in": _test_in,
+}
+
+
+def _operator_test(operator: str, condition_value: Any) -> Callable[[Any], bool]:
+    """Build a test of a (non-None) document value against a condition value."""
+    return _OPERATOR_TESTS.get(operator, _test_never)(condition_value)
+
+
+# Relative cost of checking a condition, so cheap and selective checks run
+# (and short-circuit) first
+_OPERATOR_COSTS = {"equals": 0, "not_equals": 0, "greater_than": 1, "less_than": 1, "in": 1, "contains": 2}
+_ENTITY_COST = 3
+
+
+def _condition_cost(condition: dict) -> int:
+    if condition["field"].startswith("entity_"):
+        return _ENTITY_COST
+    return _OPERATOR_COSTS.get(condition["operator"], 0)
+
+
+def _compile_check(condition: dict) -> Tuple[Getter, Callable[[Any], bool]]:
+    """A condition as a (getter, test) pair."""
+    get = _field_getter(condition["field"])
+    if condition["operator"] == "contains":
+        get = _lowered_getter(condition["field"], get)
+    return get, _operator_test(condition["operator"], condition["value"])
+
+
+def _compile_conditions(conditions: List[dict]) -> Predicate:
+    """
+    Turn a workflow's conditions into one predicate over a document.
+    Field and operator dispatch happens once here instead of per document.
+    Checks run cheapest first; the stored conditions keep the user's order.
+    """
+    checks = [_compile_check(c) for c in sorted(conditions, key=_condition_cost)]
+
+    def predicate(ctx: Context) -> bool:
+        for get, test in checks:
+            doc_value = get(ctx)
+            if doc_value is None or not test(doc_value):
+                return False
+        return True
+
+    return predicate
+
+
+def _index_workflow(workflow: dict):
+    """File a workflow in the dispatch index and compile its conditions."""
+    workflow_id = workflow["id"]
+    _predicates[workflow_id] = _compile_conditions(workflow["conditions"])
+    keys = _anchor_keys(workflow["conditions"])
+
+    if keys is None:
+        _hard_workflows.add(workflow_id)
+        return
+
+    for field, value in keys:
+        _easy_index.setdefault(field, {}).setdefault(value, set()).add(workflow_id)
+    _indexed_keys[workflow_id] = keys
+
+
+def _unindex_workflow(workflow_id: str):
+    """Remove a workflow from the dispatch index."""
+    _hard_workflows.discard(workflow_id)
+    _predicates.pop(workflow_id, None)
+
+    for field, value in _indexed_keys.pop(workflow_id, ()):
+        by_value = _easy_index[field]
+        by_value[value].discard(workflow_id)
+        if not by_value[value]:
+            del by_value[value]
+            if not by_value:
+                del _easy_index[field]
+
 
 class WorkflowService:
     """
@@ -46,6 +294,9 @@ class WorkflowService:
         }
 
         _workflows[workflow_id] = workflow
+        _creation_order[workflow_id] = next(_next_order)
+        if is_active:
+            _index_workflow(workflow)
         return workflow
 
     async def get(self, workflow_id: str) -> Optional[dict]:
@@ -53,14 +304,13 @@ class WorkflowService:
         return _workflows.get(workflow_id)
 
     async def list(self, is_active: Optional[bool] = None) -> List[dict]:
-        """List all workflows with optional active filter."""
-        workflows = list(_workflows.values())
-
-        if is_active is not None:
-            workflows = [w for w in workflows if w["is_active"] == is_active]
-
-        workflows.sort(key=lambda x: x["created_at"], reverse=True)
-        return workflows
+        """List all workflows with optional active filter, newest first."""
+        # _workflows is kept in creation order, so walking it backwards
+        # is already sorted
+        return [
+            w for w in reversed(_workflows.values())
+            if is_active is None or w["is_active"] == is_active
+        ]
 
     async def update(
         self,
@@ -87,12 +337,20 @@ class WorkflowService:
         if is_active is not None:
             workflow["is_active"] = is_active
 
+        # Re-file it if its conditions changed or it was switched on or off
+        if conditions is not None or is_active is not None:
+            _unindex_workflow(workflow_id)
+            if workflow["is_active"]:
+                _index_workflow(workflow)
+
         return workflow
 
     async def delete(self, workflow_id: str) -> bool:
         """Delete a workflow rule."""
         if workflow_id in _workflows:
             del _workflows[workflow_id]
+            del _creation_order[workflow_id]
+            _unindex_workflow(workflow_id)
             return True
         return False
 
@@ -100,15 +358,16 @@ class WorkflowService:
         """
         Evaluate all active workflows against a document.
         Returns list of triggered workflows.
+
+        Only active workflows whose indexed condition matches the document
+        (plus those that can't be indexed) have their conditions checked.
         """
         triggered = []
+        ctx = _context(document)
 
-        for workflow in _workflows.values():
-            if not workflow["is_active"]:
-                continue
-
-            if self._check_conditions(document, workflow["conditions"]):
-                logger.info(f"Workflow '{workflow['name']}' triggered for document {document['id']}")
+        for workflow in self._candidates(document):
+            if _predicates[workflow["id"]](ctx):
+                logger.info("Workflow '%s' triggered for document %s", workflow["name"], document["id"])
 
                 # Execute actions
                 await self._execute_actions(document, workflow["actions"])
@@ -120,61 +379,74 @@ class WorkflowService:
 
         return triggered
 
-    def _check_conditions(self, document: dict, conditions: List[dict]) -> bool:
+    async def evaluate_many(self, documents: List[dict]) -> List[List[dict]]:
         """
-        Check if all conditions are met for a document.
+        Evaluate all active workflows against a batch of documents.
+        Returns the triggered workflows for each document, in input order.
+
+        Same results as calling evaluate() on each document, but workflows
+        are the outer loop: each active candidate workflow is looked up once
+        and its predicate run over the documents it may match.
         """
-        for condition in conditions:
-            field = condition["field"]
-            operator = condition["operator"]
-            value = condition["value"]
-
-            # Get document field value
-            if field == "classification":
-                doc_value = document.get("classification")
-            elif field == "file_size":
-                doc_value = document.get("file_size", 0)
-            elif field == "mime_type":
-                doc_value = document.get("mime_type")
-            elif field.startswith("entity_"):
-                # Check entity values
-                entity_type = field.replace("entity_", "").upper()
-                doc_value = self._get_entity_values(document, entity_type)
-            else:
-                doc_value = document.get(field)
-
-            # Evaluate condition
-            if not self._evaluate_condition(doc_value, operator, value):
-                return False
+        candidate_ids = [self._candidate_ids(d) for d in documents]
+        contexts = [_context(d) for d in documents]
+        triggered: List[List[dict]] = [[] for _ in documents]
+
+        ids = sorted(set().union(*candidate_ids), key=_creation_order.__getitem__)
+        workflows = [_workflows[workflow_id] for workflow_id in ids]
+
+        for workflow in workflows:
+            workflow_id = workflow["id"]
+            predicate = _predicates[workflow_id]
+            hits = [
+                i for i, ctx in enumerate(contexts)
+                if workflow_id in candidate_ids[i] and predicate(ctx)
+            ]
+            if not hits:
+                continue
 
-        return True
+            logger.info("Workflow '%s' triggered for %d documents", workflow["name"], len(hits))
 
-    def _evaluate_condition(
-        self,
-        doc_value: Any,
-        operator: str,
-        condition_value: Any
-    ) -> bool:
-        """Evaluate a single condition."""
-        if doc_value is None:
-            return False
-
-        if operator == "equals":
-            return doc_value == condition_value
-        elif operator == "not_equals":
-            return doc_value != condition_value
-        elif operator == "contains":
-            if isinstance(doc_value, list):
-                return condition_value in doc_value
-            return condition_value.lower() in str(doc_value).lower()
-        elif operator == "greater_than":
-            return float(doc_value) > float(condition_value)
-        elif operator == "less_than":
-            return float(doc_value) < float(condition_value)
-        elif operator == "in":
-            return doc_value in condition_value
+            for i in hits:
+                await self._execute_actions(documents[i], workflow["actions"])
+                triggered[i].append(workflow)
 
-        return False
+            workflow["trigger_count"] += len(hits)
+
+        return triggered
+
+    def _candidate_ids(self, document: dict) -> Set[str]:
+        """IDs of workflows that may match a document."""
+        ids = set(_hard_workflows)
+
+        for field, by_value in _easy_index.items():
+            doc_value = self._get_field_value(document, field)
+            if _is_hashable(doc_value):
+                ids.update(by_value.get(doc_value, ()))
+
+        return ids
+
+    def _candidates(self, document: dict) -> List[dict]:
+        """
+        Workflows that may match a document, in creation order.
+        """
+        ids = sorted(self._candidate_ids(document), key=_creation_order.__getitem__)
+        return [_workflows[workflow_id] for workflow_id in ids]
+
+    def _get_field_value(self, document: dict, field: str) -> Any:
+        """Get the document value a condition field refers to."""
+        if field == "classification":
+            return document.get("classification")
+        elif field == "file_size":
+            return document.get("file_size", 0)
+        elif field == "mime_type":
+            return document.get("mime_type")
+        elif field.startswith("entity_"):
+            # Check entity values
+            entity_type = field.replace("entity_", "").upper()
+            return self._get_entity_values(document, entity_type)
+        else:
+            return document.get(field)
 
     def _get_entity_values(self, document: dict, entity_type: str) -> List[str]:
         """Get all values of a specific entity type from document."""
@@ -183,6 +455,9 @@ class WorkflowService:
 
     async def _execute_actions(self, document: dict, actions: List[dict]):
         """Execute workflow actions on a document."""
+        # Document as JSON for outbound actions, serialized at most once
+        payload = None
+
         for action in actions:
             action_type = action["type"]
             params = action["params"]
@@ -193,16 +468,26 @@ class WorkflowService:
                 if params["tag"] not in tags:
                     tags.append(params["tag"])
                     document["tags"] = tags
-                logger.info(f"Added tag '{params['tag']}' to document")
+                logger.info("Added tag '%s' to document", params["tag"])
 
             elif action_type == "notify":
-                # Send notification (placeholder)
-                logger.info(f"Notification: {params.get('message')} to {params.get('email')}")
+                # Send notification (placeholder: would POST the payload)
+                if payload is None:
+                    payload = orjson.dumps(document, option=orjson.OPT_NON_STR_KEYS)
+                logger.info(
+                    "Notification: %s to %s (%d byte payload)",
+                    params.get("message"), params.get("email"), len(payload)
+                )
 
             elif action_type == "move":
                 # Move to folder (placeholder)
-                logger.info(f"Would move document to folder: {params.get('folder')}")
+                logger.info("Would move document to folder: %s", params.get("folder"))
 
             elif action_type == "approve_request":
-                # Create approval request (placeholder)
-                logger.info(f"Approval requested from: {params.get('approver')}")
+                # Create approval request (placeholder: would POST the payload)
+                if payload is None:
+                    payload = orjson.dumps(document, option=orjson.OPT_NON_STR_KEYS)
+                logger.info(
+                    "Approval requested from: %s (%d byte payload)",
+                    params.get("approver"), len(payload)
+                )